@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""Network path probe: TCP/UDP throughput and RTT between two endpoints.
+
+Run `net_probe.py server` on one end and `net_probe.py client HOST` on the
+other, each optionally pinned to an interface (a bridge, VLAN or bond from
+the netplan files) with SO_BINDTODEVICE. TCP streams are sent with
+sendfile() from a pre-filled buffer file and received with recv_into() on
+a reused memoryview, so neither side copies payload through Python. Each
+stream runs in its own thread on both ends. Results are measured by the
+receiver.
+"""
+import os
+import sys
+import errno
+import json
+import time
+import socket
+import struct
+import argparse
+import tempfile
+import threading
+
+# ANSI colors - same palette as network_interfaces.py
+RED = "\033[38;5;208m"
+GREEN = "\033[38;5;118m"
+YELLOW = "\033[38;5;3m"
+RESET = "\033[0m"
+BOLD = "\033[1m"
+
+DEFAULT_PORT = 5201
+CHUNK = 1 << 20             # sendfile()/recv_into() unit for TCP streams
+UDP_HEADER = struct.Struct("!Q")  # datagram sequence number
+IP_UDP_OVERHEAD = {socket.AF_INET: 28, socket.AF_INET6: 48}  # IP + UDP header bytes per datagram
+
+
+def bind_device(sock, interface):
+    """Pin a socket to an interface (SO_BINDTODEVICE, needs CAP_NET_RAW)."""
+    if interface:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.encode())
+
+
+def send_line(sock, obj):
+    """Send one newline-terminated JSON control message."""
+    sock.sendall(json.dumps(obj).encode() + b"\n")
+
+
+def read_line(sock):
+    """Read one control message; byte at a time so no payload is consumed."""
+    data = bytearray()
+    while True:
+        byte = sock.recv(1)
+        if not byte:
+            raise ConnectionError("control connection closed")
+        if byte == b"\n":
+            message = json.loads(data)
+            if not isinstance(message, dict):
+                raise ValueError(f"malformed control message: {bytes(data)[:80]!r}")
+            return message
+        data += byte
+
+
+def recv_exact(sock, view):
+    """Fill the whole memoryview from the socket."""
+    got = 0
+    while got < len(view):
+        n = sock.recv_into(view[got:])
+        if not n:
+            raise ConnectionError("connection closed mid-message")
+        got += n
+
+
+def percentiles(samples):
+    """min/p50/p90/p99/max of a list of milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+    return {"min": ordered[0], "p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": ordered[-1]}
+
+
+# Server side
+
+def serve_tcp(conn, request):
+    """Receive one TCP stream until the sender shuts down; report bytes and time."""
+    buf = memoryview(bytearray(CHUNK))
+    total, first = 0, None
+    while True:
+        n = conn.recv_into(buf)
+        if not n:
+            break
+        if first is None:
+            first = time.perf_counter()
+        total += n
+    elapsed = time.perf_counter() - first if first else 0.0
+    mss = conn.getsockopt(socket.IPPROTO_TCP, socket.TCP_MAXSEG)
+    send_line(conn, {"bytes": total, "seconds": elapsed, "mss": mss})
+
+
+def serve_udp(conn, request, bind, interface):
+    """Count datagrams on an ephemeral UDP port until the client says it is done."""
+    family = conn.family
+    udp = socket.socket(family, socket.SOCK_DGRAM)
+    udp.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+    bind_device(udp, interface)
+    udp.bind((bind, 0))
+    udp.settimeout(0.2)
+    done = threading.Event()
+    stats = {"packets": 0, "bytes": 0, "first": None, "last": None}
+
+    def receive():
+        buf = memoryview(bytearray(65536))
+        while True:
+            try:
+                n = udp.recv_into(buf)
+            except socket.timeout:
+                # After the client is done, one idle timeout drains the socket
+                if done.is_set():
+                    return
+                continue
+            now = time.perf_counter()
+            if stats["first"] is None:
+                stats["first"] = now
+            stats["last"] = now
+            stats["packets"] += 1
+            stats["bytes"] += n
+
+    receiver = threading.Thread(target=receive, daemon=True)
+    receiver.start()
+    send_line(conn, {"port": udp.getsockname()[1]})
+    sent = read_line(conn)["sent"]
+    done.set()
+    receiver.join()
+    udp.close()
+    elapsed = stats["last"] - stats["first"] if stats["packets"] > 1 else 0.0
+    send_line(conn, {"packets": stats["packets"], "bytes": stats["bytes"], "seconds": elapsed,
+                     "lost": max(sent - stats["packets"], 0)})
+
+
+def serve_rtt(conn, request):
+    """Echo fixed-size messages back until the client closes."""
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    view = memoryview(bytearray(request["size"]))
+    try:
+        while True:
+            recv_exact(conn, view)
+            conn.sendall(view)
+    except ConnectionError:
+        pass
+
+
+def handle(conn, peer, bind, interface):
+    """One client connection: the first control line picks the test."""
+    with conn:
+        try:
+            request = read_line(conn)
+            mode = request.get("mode")
+            if mode == "tcp":
+                serve_tcp(conn, request)
+            elif mode == "udp":
+                serve_udp(conn, request, bind, interface)
+            elif mode == "rtt":
+                serve_rtt(conn, request)
+        except (OSError, ValueError, KeyError) as e:
+            sys.stderr.write(f"{peer[0]}: {e}\n")
+
+
+def server(bind="", port=DEFAULT_PORT, interface=None, ready=None):
+    """Accept probe connections forever, one thread per connection."""
+    family = socket.AF_INET6 if ":" in bind else socket.AF_INET
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    bind_device(listener, interface)
+    listener.bind((bind, port))
+    listener.listen(64)
+    if ready:
+        ready.set()
+    try:
+        while True:
+            conn, peer = listener.accept()
+            threading.Thread(target=handle, args=(conn, peer, bind, interface), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+
+
+# Client side
+
+def connect(host, port, interface, timeout=10):
+    """TCP control/data connection, pinned to the interface if given."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    bind_device(sock, interface)
+    sock.settimeout(timeout)
+    sock.connect((host, port))
+    return sock
+
+
+def payload_file():
+    """Temporary file holding one CHUNK of random bytes, the sendfile() source."""
+    f = tempfile.TemporaryFile()
+    f.write(os.urandom(CHUNK))
+    f.flush()
+    return f
+
+
+def tcp_stream(host, port, interface, duration, payload, results, index):
+    """Stream the payload file with sendfile() for duration seconds; a failure is stored as the result."""
+    try:
+        with connect(host, port, interface) as sock:
+            send_line(sock, {"mode": "tcp"})
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                sock.sendfile(payload, 0, CHUNK)
+            sock.shutdown(socket.SHUT_WR)
+            sock.settimeout(duration + 30)
+            results[index] = read_line(sock)
+    except (OSError, ValueError) as e:
+        results[index] = e
+
+
+def run_tcp(host, port, interface, duration, streams):
+    """Parallel TCP streams; receiver-side Gbit/s and estimated segments/s."""
+    results = [None] * streams
+    with payload_file() as payload:
+        threads = [threading.Thread(target=tcp_stream, args=(host, port, interface, duration, payload, results, i))
+                   for i in range(streams)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    # A missing stream would understate the link, so any failure fails the test
+    for index, result in enumerate(results):
+        if not isinstance(result, dict):
+            raise OSError(f"TCP stream {index}: {result or 'no result'}")
+    total = sum(r["bytes"] for r in results)
+    seconds = max((r["seconds"] for r in results), default=0) or duration
+    mss = min((r["mss"] for r in results), default=1448) or 1448
+    return {"mode": "tcp", "streams": len(results), "seconds": round(seconds, 3), "bytes": total,
+            "gbps": total * 8 / seconds / 1e9, "pps": total / mss / seconds}
+
+
+def run_udp(host, port, interface, duration, size):
+    """Blast sequence-numbered datagrams for duration seconds; receiver counts and loss."""
+    with connect(host, port, interface) as control:
+        overhead = IP_UDP_OVERHEAD[control.family]
+        send_line(control, {"mode": "udp", "size": size})
+        target = (host, read_line(control)["port"])
+        udp = socket.socket(control.family, socket.SOCK_DGRAM)
+        bind_device(udp, interface)
+        udp.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 8 << 20)
+        buf = bytearray(size)
+        view = memoryview(buf)
+        sent = 0
+        deadline = time.perf_counter() + duration
+        with udp:
+            while time.perf_counter() < deadline:
+                # Check the clock every 256 datagrams to keep the send loop tight
+                for _ in range(256):
+                    UDP_HEADER.pack_into(buf, 0, sent)
+                    try:
+                        udp.sendto(view, target)
+                    except OSError as e:
+                        # Full socket/qdisc queue: drop this datagram and keep going
+                        if e.errno in (errno.ENOBUFS, errno.EAGAIN):
+                            continue
+                        raise
+                    sent += 1
+        send_line(control, {"sent": sent})
+        control.settimeout(30)
+        result = read_line(control)
+    seconds = result["seconds"] or duration
+    return {"mode": "udp", "size": size, "seconds": round(seconds, 3), "sent": sent, "packets": result["packets"],
+            "lost": result["lost"], "loss_pct": 100 * result["lost"] / sent if sent else 0.0,
+            "gbps": (result["bytes"] + result["packets"] * overhead) * 8 / seconds / 1e9,
+            "pps": result["packets"] / seconds}
+
+
+def run_rtt(host, port, interface, count, size):
+    """TCP_NODELAY ping-pong of size-byte messages; RTT percentiles in ms."""
+    with connect(host, port, interface) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        send_line(sock, {"mode": "rtt", "size": size})
+        out, back = memoryview(os.urandom(size)), memoryview(bytearray(size))
+        samples = []
+        for _ in range(count):
+            start = time.perf_counter()
+            sock.sendall(out)
+            recv_exact(sock, back)
+            samples.append((time.perf_counter() - start) * 1000)
+    return {"mode": "rtt", "size": size, "count": count, "ms": percentiles(samples)}
+
+
+def render(results, target):
+    """Text report, as a list of lines."""
+    out = [f"{BOLD}Network path probe{RESET} → {target}"]
+    for r in results:
+        if r["mode"] == "tcp":
+            out.append(f"  TCP x{r['streams']}:  {GREEN}{r['gbps']:.2f} Gbit/s{RESET}  {r['pps']:,.0f} segments/s (est.)"
+                       f"  over {r['seconds']:g}s")
+        elif r["mode"] == "udp":
+            loss_color = GREEN if r["loss_pct"] < 0.1 else (YELLOW if r["loss_pct"] < 1 else RED)
+            out.append(f"  UDP {r['size']}B: {GREEN}{r['gbps']:.2f} Gbit/s{RESET}  {r['pps']:,.0f} pps"
+                       f"  loss {loss_color}{r['loss_pct']:.2f}%{RESET} ({r['lost']}/{r['sent']})")
+        elif r["mode"] == "rtt":
+            ms = r["ms"]
+            out.append(f"  RTT {r['size']}B:  p50 {ms['p50']:.3f} ms  p90 {ms['p90']:.3f} ms  p99 {ms['p99']:.3f} ms"
+                       f"  (min {ms['min']:.3f}, max {ms['max']:.3f}, n={r['count']})")
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TCP/UDP throughput and RTT probe between two endpoints")
+    sub = parser.add_subparsers(dest="role", required=True)
+    srv = sub.add_parser("server", help="accept probe connections")
+    srv.add_argument("--bind", default="", help="local address to listen on")
+    cli = sub.add_parser("client", help="run probes against a server")
+    cli.add_argument("host", help="server address")
+    cli.add_argument("--tests", default="tcp,udp,rtt", help="comma-separated subset of tcp,udp,rtt")
+    cli.add_argument("--duration", type=float, default=5, help="seconds per throughput test")
+    cli.add_argument("--streams", type=int, default=1, help="parallel TCP streams")
+    cli.add_argument("--udp-size", type=int, default=1472, help="UDP payload bytes")
+    cli.add_argument("--count", type=int, default=1000, help="RTT round trips")
+    cli.add_argument("--rtt-size", type=int, default=64, help="RTT message bytes")
+    cli.add_argument("--json", action="store_true", help="emit results as JSON")
+    for p in (srv, cli):
+        p.add_argument("--port", type=int, default=DEFAULT_PORT, help="probe port")
+        p.add_argument("--interface", help="pin sockets to this interface (SO_BINDTODEVICE)")
+    args = parser.parse_args(argv)
+
+    if args.role == "server":
+        server(args.bind, args.port, args.interface)
+        return
+
+    tests = {
+        "tcp": lambda: run_tcp(args.host, args.port, args.interface, args.duration, args.streams),
+        "udp": lambda: run_udp(args.host, args.port, args.interface, args.duration, args.udp_size),
+        "rtt": lambda: run_rtt(args.host, args.port, args.interface, args.count, args.rtt_size),
+    }
+    try:
+        runs = [tests[name.strip()] for name in args.tests.split(",")]
+    except KeyError as e:
+        parser.error(f"unknown test {e}")
+    results = []
+    try:
+        for run in runs:
+            results.append(run())
+    except (OSError, ValueError, KeyError) as e:
+        # ValueError/KeyError: the server's control or result line was malformed
+        detail = f"server reply missing {e}" if isinstance(e, KeyError) else e
+        sys.stderr.write(f"{RED}probe failed: {detail}{RESET}\n")
+        sys.exit(1)
+    target = f"{args.host}:{args.port}" + (f" via {args.interface}" if args.interface else "")
+    out = [json.dumps({"target": target, "results": results})] if args.json else render(results, target)
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,14 @@ import os
 import re
 import subprocess
 import glob
-from pathlib import Path
+import sys
+import json
+import socket
+import argparse
+import time
+import atexit
+import errno
+import struct
 
 # ANSI colors - using provided color codes
 RED = "\033[38;5;208m"     # Warning/Error
@@ -14,24 +21,158 @@ CYAN = "\033[38;5;33m"     # Bridge
 RESET = "\033[0m"
 BOLD = "\033[1m"
 
+# Kernel interfaces read by the collectors (overridable to replay a recorded tree)
+SYS_NET = "/sys/class/net"
+PROC_NET = "/proc/net"
+
+TYPE_COLORS = {"Bridge": CYAN, "VLAN": BLUE, "Ethernet (10G+)": GREEN, "Ethernet (1G)": YELLOW}
+
+# Subprocess profile: None when off, else one record per command run
+PROFILE = None
+
 def run_command(command):
     """Run a shell command and return its output."""
+    started, code, output = time.monotonic(), None, ""
     try:
         result = subprocess.run(command, shell=True, check=True, 
                                text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        code, output = result.returncode, result.stdout
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
+        code, output = e.returncode, e.stdout or ""
         return f"Error: {e.stderr.strip()}"
+    finally:
+        if PROFILE is not None:
+            PROFILE.append({"cmd": command, "start": started, "seconds": time.monotonic() - started,
+                            "exit": code, "bytes": len(output)})
+        
+def profile_report(records, top=10):
+    """Summarize profiled commands: costliest command kinds, then slowest runs."""
+    if not records:
+        return ["No external commands were run."]
+    groups = {}
+    # Only names already loaded: loading the table here would run another `ip` at exit
+    names = _link_table or {}
+    for rec in records:
+        # Group by the command with the interface argument removed
+        probe = " ".join(word if word not in names else "<if>" for word in rec["cmd"].split())
+        group = groups.setdefault(probe, [0, 0.0, 0.0])
+        group[0] += 1
+        group[1] += rec["seconds"]
+        group[2] = max(group[2], rec["seconds"])
+    total = sum(r["seconds"] for r in records)
+    out = [
+        f"{BOLD}External commands: {len(records)} run, {total:.3f}s total{RESET}",
+        f"{BOLD}{'count':>6}{'total s':>10}{'max s':>9}  probe{RESET}",
+    ]
+    for probe, (count, secs, worst) in sorted(groups.items(), key=lambda g: -g[1][1])[:top]:
+        out.append(f"{count:>6}{secs:>10.3f}{worst:>9.3f}  {probe}")
+    out.append(f"{BOLD}{'seconds':>9}{'exit':>9}{'bytes':>9}  slowest commands{RESET}")
+    for rec in sorted(records, key=lambda r: -r["seconds"])[:top]:
+        out.append(f"{rec['seconds']:>9.3f}{str(rec['exit']):>9}{rec['bytes']:>9}  {rec['cmd']}")
+    return out
+    
+def finish_profile(top, trace):
+    """atexit hook: table to stderr (stdout may carry JSON) and/or a JSON trace file."""
+    records = list(PROFILE)
+    base = min((r["start"] for r in records), default=0)
+    if trace:
+        with open(trace, "w") as f:
+            json.dump([{**r, "start": r["start"] - base} for r in records], f)
+    if top:
+        sys.stderr.write("\n".join(profile_report(records, top)) + "\n")
+        
+_link_table = None
+_type_cache = {}
+
+def load_link_table():
+    """Collect links, link kinds and addresses in a single `ip -j -d addr` pass."""
+    table = {}
+    output = run_command("ip -j -d addr show")
+    try:
+        links = json.loads(output)
+    except ValueError:
+        return load_link_table_sysfs()
+        
+    for link in links:
+        linkinfo = link.get("linkinfo", {})
+        addrs = link.get("addr_info", [])
+        table[link["ifname"]] = {
+            "ifindex": link.get("ifindex"),
+            "kind": linkinfo.get("info_kind"),
+            "slave_kind": linkinfo.get("info_slave_kind"),
+            "master": link.get("master"),
+            "parent": link.get("link"),
+            "vlan_id": linkinfo.get("info_data", {}).get("id") if linkinfo.get("info_kind") == "vlan" else None,
+            "mtu": link.get("mtu"),
+            "operstate": link.get("operstate"),
+            "mac": link.get("address"),
+            "ipv4": [a["local"] for a in addrs if a.get("family") == "inet"],
+            "ipv6": [a["local"] for a in addrs if a.get("family") == "inet6"],
+        }
+    return table
+    
+def load_link_table_sysfs():
+    """Fallback for iproute2 without JSON support: sysfs plus one `ip -o addr` call."""
+    table = {}
+    for interface in os.listdir(SYS_NET):
+        base = f"{SYS_NET}/{interface}"
+        if os.path.exists(f"{base}/bridge"):
+            kind = "bridge"
+        elif os.path.exists(f"{base}/bonding"):
+            kind = "bond"
+        elif os.path.exists(f"{PROC_NET}/vlan/{interface}"):
+            kind = "vlan"
+        else:
+            kind = None
+        master = os.path.realpath(f"{base}/master") if os.path.exists(f"{base}/master") else None
+        table[interface] = {
+            "ifindex": int(read_sysfs(interface, "ifindex") or 0),
+            "kind": kind,
+            "slave_kind": None,
+            "master": os.path.basename(master) if master else None,
+            "parent": None,
+            "vlan_id": None,
+            "mtu": int(read_sysfs(interface, "mtu") or 0),
+            "operstate": (read_sysfs(interface, "operstate") or "").upper() or None,
+            "mac": read_sysfs(interface, "address"),
+            "ipv4": [],
+            "ipv6": [],
+        }
+        
+    output = run_command("ip -o addr show")
+    for match in re.finditer(r'^\d+: (\S+)\s+(inet6?) ([0-9a-f.:]+)', output, re.M):
+        interface, family, address = match.groups()
+        if interface in table:
+            table[interface]["ipv4" if family == "inet" else "ipv6"].append(address)
+    return table
+    
+def read_sysfs(interface, attr):
+    """Read a /sys/class/net attribute, None if missing or unreadable."""
+    try:
+        with open(f"{SYS_NET}/{interface}/{attr}", 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
         
+def get_link_table(refresh=False):
+    """Per-interface records shared by all the helpers, collected once per run."""
+    global _link_table
+    if _link_table is None or refresh:
+        _link_table = load_link_table()
+        # Forget interfaces that are gone so tap churn can't grow the type cache
+        live = {link.get("ifindex") or name for name, link in _link_table.items()}
+        for ifindex in [i for i in _type_cache if i not in live]:
+            del _type_cache[ifindex]
+    return _link_table
+    
+def get_link(interface):
+    """Record for one interface (empty if it vanished since collection)."""
+    return get_link_table().get(interface, {})
+    
 def get_interfaces():
     """Get a list of network interfaces."""
-    interfaces = []
-    if os.path.exists("/sys/class/net/"):
-        interfaces = os.listdir("/sys/class/net/")
-    else:
-        output = run_command("ip link show")
-        interfaces = re.findall(r'\d+: (\w+):', output)
-    return interfaces
+    return list(get_link_table())
     
 def is_vlan_interface(interface):
     """Check if interface is a VLAN interface."""
@@ -40,11 +181,7 @@ def is_vlan_interface(interface):
         return True
         
     # Check if it's explicitly tagged as a VLAN
-    output = run_command(f"ip -d link show {interface}")
-    if "vlan" in output.lower():
-        return True
-        
-    return False
+    return get_link(interface).get("kind") == "vlan"
     
 def is_bridge_interface(interface):
     """Check if interface is a bridge."""
@@ -52,43 +189,39 @@ def is_bridge_interface(interface):
         return True
         
     # Check if it's explicitly a bridge
-    output = run_command(f"ip -d link show {interface}")
-    if "bridge" in output.lower():
+    if get_link(interface).get("kind") in ("bridge", "openvswitch"):
         return True
         
     # Try another method
-    bridge_path = f"/sys/class/net/{interface}/bridge"
+    bridge_path = f"{SYS_NET}/{interface}/bridge"
     if os.path.exists(bridge_path):
         return True
         
     return False
     
-def get_interface_type(interface, with_color=False):
+def detect_interface_type(interface):
     """Determine the interface type based on naming conventions or driver info."""
     if interface.startswith("wl"):
         return "Wireless"
     elif is_bridge_interface(interface):
-        return f"{CYAN}Bridge{RESET}" if with_color else "Bridge"
+        return "Bridge"
     elif is_vlan_interface(interface):
-        return f"{BLUE}VLAN{RESET}" if with_color else "VLAN"
+        return "VLAN"
     elif interface.startswith("en") or interface.startswith("eth"):
         speed = get_link_speed(interface, raw=True)
         if speed >= 10000:
-            return f"{GREEN}Ethernet (10G+){RESET}" if with_color else "Ethernet (10G+)"
+            return "Ethernet (10G+)"
         else:
-            return f"{YELLOW}Ethernet (1G){RESET}" if with_color else "Ethernet (1G)"
+            return "Ethernet (1G)"
     elif interface.startswith("lo"):
         return "Loopback"
     elif interface.startswith("docker") or interface.startswith("veth"):
         return "Docker/Container"
     elif interface.startswith("v") or "virt" in interface:
-        # Check if it's a VLAN first
-        if is_vlan_interface(interface):
-            return f"{BLUE}VLAN{RESET}" if with_color else "VLAN"
         return "Virtual"
         
     # Try to get more specific info from driver
-    driver_path = f"/sys/class/net/{interface}/device/driver"
+    driver_path = f"{SYS_NET}/{interface}/device/driver"
     if os.path.exists(driver_path):
         driver = os.path.basename(os.readlink(driver_path))
         if any(wl in driver for wl in ["wireless", "wifi", "80211"]):
@@ -96,43 +229,47 @@ def get_interface_type(interface, with_color=False):
             
     return "Unknown"
     
+def classify_interface(interface):
+    """Plain interface type, computed once per ifindex and link-change count."""
+    # carrier_changes bumps on every link flap (speed renegotiation included),
+    # so long-running callers reclassify only interfaces that actually changed.
+    # One entry per ifindex: a flap replaces the entry instead of adding one.
+    key = get_link(interface).get("ifindex") or interface
+    stamp = (interface, read_sysfs(interface, "carrier_changes"))
+    cached = _type_cache.get(key)
+    if cached is None or cached[0] != stamp:
+        cached = _type_cache[key] = (stamp, detect_interface_type(interface))
+    return cached[1]
+    
+def get_interface_type(interface, with_color=False):
+    """Get the interface type, optionally wrapped in its legend color."""
+    itype = classify_interface(interface)
+    if with_color and itype in TYPE_COLORS:
+        return f"{TYPE_COLORS[itype]}{itype}{RESET}"
+    return itype
+    
 def get_ip_addresses(interface):
     """Get IP addresses for an interface."""
-    output = run_command(f"ip addr show {interface}")
-    ipv4 = re.findall(r'inet (\d+\.\d+\.\d+\.\d+)', output)
-    ipv6 = re.findall(r'inet6 ([0-9a-f:]+)', output)
-    return {"IPv4": ipv4, "IPv6": ipv6}
+    link = get_link(interface)
+    return {"IPv4": link.get("ipv4", []), "IPv6": link.get("ipv6", [])}
     
 def get_mac_address(interface):
     """Get MAC address for an interface."""
-    mac_path = f"/sys/class/net/{interface}/address"
-    if os.path.exists(mac_path):
-        with open(mac_path, 'r') as f:
-            return f.read().strip()
-    else:
-        output = run_command(f"ip link show {interface}")
-        mac_match = re.search(r'link/\w+ ([0-9a-f:]+)', output)
-        if mac_match:
-            return mac_match.group(1)
-    return "Not available"
+    return get_link(interface).get("mac") or read_sysfs(interface, "address") or "Not available"
     
 def get_link_speed(interface, raw=False):
     """Get link speed for an interface."""
-    speed_path = f"/sys/class/net/{interface}/speed"
+    speed_path = f"{SYS_NET}/{interface}/speed"
     if os.path.exists(speed_path):
-        try:
-            with open(speed_path, 'r') as f:
-                speed = f.read().strip()
-                if speed.isdigit():
-                    if raw:
-                        return int(speed)
-                    return f"{speed} Mbps"
-                else:
-                    if raw:
-                        return 0
-                    return "Unknown"
-        except:
-            pass
+        # Same ksettings ethtool reports; virtual/down links fail to read
+        speed = read_sysfs(interface, "speed") or ""
+        if speed.isdigit():
+            if raw:
+                return int(speed)
+            return f"{speed} Mbps"
+        if raw:
+            return 0
+        return "Unknown"
     
     # Try with ethtool if available
     output = run_command(f"ethtool {interface} 2>/dev/null | grep 'Speed:'")
@@ -156,16 +293,7 @@ def get_link_speed(interface, raw=False):
     
 def get_interface_status(interface, with_color=False):
     """Get status (UP/DOWN) for an interface."""
-    state_path = f"/sys/class/net/{interface}/operstate"
-    if os.path.exists(state_path):
-        with open(state_path, 'r') as f:
-            status = f.read().strip().upper()
-    else:
-        output = run_command(f"ip link show {interface}")
-        if "UP" in output:
-            status = "UP"
-        else:
-            status = "DOWN"
+    status = (read_sysfs(interface, "operstate") or get_link(interface).get("operstate") or "DOWN").upper()
             
     if with_color:
         if status == "UP":
@@ -178,90 +306,574 @@ def get_interface_status(interface, with_color=False):
         
 def get_driver_info(interface):
     """Get driver information for an interface."""
-    driver_path = f"/sys/class/net/{interface}/device/driver/module"
+    driver_path = f"{SYS_NET}/{interface}/device/driver/module"
     if os.path.exists(driver_path):
         module_name = os.path.basename(os.readlink(driver_path))
         return module_name
         
     # Alternative approach
-    driver_path = f"/sys/class/net/{interface}/device/driver"
+    driver_path = f"{SYS_NET}/{interface}/device/driver"
     if os.path.exists(driver_path):
         return os.path.basename(os.readlink(driver_path))
         
     return "Not available"
     
-def get_interface_color(interface, itype):
+def get_interface_color(interface, itype=None):
     """Get color for interface header based on type."""
-    if is_bridge_interface(interface):
-        return CYAN
-    elif is_vlan_interface(interface):
-        return BLUE
-    elif "Ethernet" in itype:
-        if "(10G+)" in itype:
-            return GREEN
-        else:
-            return YELLOW
-    return ""  # Default, no color
-    
-def main():
-    print(f"{BOLD}Network Interfaces Information{RESET}\n" + "="*30)
-    print("Interface Type Legend:")
-    print(f"  {YELLOW}Ethernet (1G){RESET}: 1 Gigabit Ethernet interfaces")
-    print(f"  {GREEN}Ethernet (10G+){RESET}: 10+ Gigabit Ethernet interfaces")
-    print(f"  {BLUE}VLAN{RESET}: Virtual LAN interfaces")
-    print(f"  {CYAN}Bridge{RESET}: Network bridge interfaces")
+    return TYPE_COLORS.get(itype or classify_interface(interface), "")  # Default, no color
     
+STATUS_COLORS = {"UP": GREEN, "DOWN": RED}
+
+def collect_interface(interface):
+    """Gather one interface record (plain values, no color formatting)."""
     try:
-        interfaces = get_interfaces()
+        link = get_link(interface)
+        ip_addresses = get_ip_addresses(interface)
+        return {
+            "name": interface,
+            "type": classify_interface(interface),
+            "status": get_interface_status(interface, with_color=False),
+            "mac": get_mac_address(interface),
+            "ipv4": ip_addresses["IPv4"],
+            "ipv6": ip_addresses["IPv6"],
+            "speed": get_link_speed(interface),
+            "speed_mbps": get_link_speed(interface, raw=True),
+            "driver": get_driver_info(interface),
+            "kind": link.get("kind"),
+            "master": link.get("master"),
+            "mtu": link.get("mtu"),
+        }
+    except Exception as e:
+        return {"name": interface, "error": str(e)}
+
+def collect():
+    """Gather records for every interface on the host."""
+    return {
+        "host": socket.gethostname(),
+        "interfaces": [collect_interface(interface) for interface in sorted(get_interfaces())],
+    }
+
+def render(report):
+    """Render the colored text report as a list of lines."""
+    out = [
+        f"{BOLD}Network Interfaces Information{RESET}\n" + "="*30,
+        "Interface Type Legend:",
+        f"  {YELLOW}Ethernet (1G){RESET}: 1 Gigabit Ethernet interfaces",
+        f"  {GREEN}Ethernet (10G+){RESET}: 10+ Gigabit Ethernet interfaces",
+        f"  {BLUE}VLAN{RESET}: Virtual LAN interfaces",
+        f"  {CYAN}Bridge{RESET}: Network bridge interfaces",
+    ]
+    
+    if not report["interfaces"]:
+        out.append("No network interfaces found.")
+        return out
         
-        if not interfaces:
-            print("No network interfaces found.")
-            return
+    for rec in report["interfaces"]:
+        interface = rec["name"]
+        if "error" in rec:
+            out.append(f"  {RED}Error gathering information for {interface}: {rec['error']}{RESET}")
+            continue
             
-        for interface in sorted(interfaces):
+        # Color is applied only here, from the cached plain classification
+        color = get_interface_color(interface, rec["type"])
+        out.append(f"\n{color}{BOLD}{interface} {'='*(25-len(interface))}{RESET}")
+        
+        # Interface Type and Status (with color)
+        out.append(f"  Type:       {color}{rec['type']}{RESET}" if color else f"  Type:       {rec['type']}")
+        out.append(f"  Status:     {STATUS_COLORS.get(rec['status'], YELLOW)}{rec['status']}{RESET}")
+        
+        # MAC and IP Addresses
+        out.append(f"  MAC:        {rec['mac']}")
+        out.append(f"  IPv4:       {', '.join(rec['ipv4']) if rec['ipv4'] else 'None'}")
+        out.append(f"  IPv6:       {', '.join(rec['ipv6'][:1]) if rec['ipv6'] else 'None'}")
+        if len(rec['ipv6']) > 1:
+            out.append(f"               ({len(rec['ipv6'])-1} more IPv6 addresses not shown)")
+        
+        # Link Speed and Driver Info
+        out.append(f"  Link Speed: {rec['speed']}")
+        out.append(f"  Driver:     {rec['driver']}")
+    return out
+
+COUNTERS = ("rx_bytes", "rx_packets", "rx_errors", "rx_dropped", "tx_bytes", "tx_packets", "tx_errors", "tx_dropped")
+
+def read_counters():
+    """Traffic counters for every interface from a single /proc/net/dev read."""
+    counters = {}
+    try:
+        with open(f"{PROC_NET}/dev", 'r') as f:
+            lines = f.readlines()[2:]
+    except OSError:
+        return read_counters_sysfs()
+    for line in lines:
+        name, _, fields = line.partition(":")
+        values = fields.split()
+        if len(values) >= 12:
+            counters[name.strip()] = tuple(int(values[i]) for i in (0, 1, 2, 3, 8, 9, 10, 11))
+    return counters
+    
+def read_counters_sysfs():
+    """Fallback: the same counters from /sys/class/net/*/statistics."""
+    counters = {}
+    for interface in os.listdir(SYS_NET):
+        values = [read_sysfs(interface, f"statistics/{counter}") for counter in COUNTERS]
+        if all(v and v.isdigit() for v in values):
+            counters[interface] = tuple(int(v) for v in values)
+    return counters
+    
+def compute_rates(prev, cur, elapsed):
+    """Per-second rates between two counter samples, with utilization vs link speed."""
+    rates = []
+    for interface, values in cur.items():
+        if interface not in prev:
+            continue
+        # Counters reset when a driver reloads; treat a negative delta as idle
+        delta = [max(v - p, 0) / elapsed for v, p in zip(values, prev[interface])]
+        rate = dict(zip(COUNTERS, delta))
+        speed = get_link_speed(interface, raw=True)
+        rate["name"] = interface
+        rate["speed_mbps"] = speed
+        rate["util"] = max(rate["rx_bytes"], rate["tx_bytes"]) * 8 / (speed * 1e4) if speed else None
+        rates.append(rate)
+    rates.sort(key=lambda r: (-(r["util"] or 0), -(r["rx_bytes"] + r["tx_bytes"]), r["name"]))
+    return rates
+    
+def render_rates(rates, interval):
+    """Render one watch frame as a list of lines."""
+    out = [
+        f"{BOLD}Network Interface Throughput{RESET} (every {interval:g}s, Ctrl-C to exit)",
+        f"{BOLD}{'Interface':<16}{'Type':<17}{'Speed':>8}{'RX Mb/s':>10}{'TX Mb/s':>10}{'Util':>7}"
+        f"{'RX pps':>10}{'TX pps':>10}{'Drop/s':>8}{'Err/s':>8}{RESET}",
+    ]
+    for r in rates:
+        itype = classify_interface(r["name"])
+        speed = f"{r['speed_mbps'] // 1000}G" if r["speed_mbps"] >= 1000 else (f"{r['speed_mbps']}M" if r["speed_mbps"] else "-")
+        if r["util"] is None:
+            util = f"{'-':>7}"
+        else:
+            util_color = RED if r["util"] >= 80 else YELLOW if r["util"] >= 50 else GREEN
+            util = f"{util_color}{r['util']:>6.1f}%{RESET}"
+        drops = r["rx_dropped"] + r["tx_dropped"]
+        errors = r["rx_errors"] + r["tx_errors"]
+        out.append(
+            f"{get_interface_color(r['name'], itype)}{r['name'][:15]:<16}{RESET}{itype[:16]:<17}{speed:>8}"
+            f"{r['rx_bytes'] * 8 / 1e6:>10.2f}{r['tx_bytes'] * 8 / 1e6:>10.2f}{util}"
+            f"{r['rx_packets']:>10.0f}{r['tx_packets']:>10.0f}"
+            f"{RED if drops else ''}{drops:>8.1f}{RESET}{RED if errors else ''}{errors:>8.1f}{RESET}"
+        )
+    return out
+    
+def watch(interval, as_json=False):
+    """Sample counters every interval and redraw rates in place (or stream NDJSON)."""
+    host = socket.gethostname()
+    prev, prev_time = read_counters(), time.monotonic()
+    next_tick = prev_time + interval
+    try:
+        while True:
+            # Sleep to a fixed schedule so render time doesn't skew the interval
+            time.sleep(max(next_tick - time.monotonic(), 0))
+            next_tick += interval
+            cur, now = read_counters(), time.monotonic()
+            rates = compute_rates(prev, cur, now - prev_time)
+            prev, prev_time = cur, now
+            if as_json:
+                stamp = time.time()
+                out = [json.dumps({"host": host, "time": stamp, **r}) for r in rates]
+                sys.stdout.write("\n".join(out) + "\n" if out else "")
+            else:
+                sys.stdout.write("\033[H\033[J" + "\n".join(render_rates(rates, interval)) + "\n")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+        
+# rtnetlink constants (linux/rtnetlink.h, if_link.h, if_addr.h)
+RTMGRP_LINK, RTMGRP_IPV4_IFADDR, RTMGRP_IPV6_IFADDR = 0x1, 0x10, 0x100
+RTM_NEWLINK, RTM_DELLINK, RTM_NEWADDR, RTM_DELADDR = 16, 17, 20, 21
+IFLA_IFNAME, IFLA_MTU, IFLA_OPERSTATE = 3, 4, 16
+IFA_ADDRESS, IFA_LOCAL = 1, 2
+OPER_STATES = ("UNKNOWN", "NOTPRESENT", "DOWN", "LOWERLAYERDOWN", "TESTING", "DORMANT", "UP")
+
+def parse_rtattrs(data, offset):
+    """Decode a run of rtattr TLVs into {type: payload}."""
+    attrs = {}
+    while offset + 4 <= len(data):
+        length, kind = struct.unpack_from("HH", data, offset)
+        if length < 4:
+            break
+        attrs[kind] = data[offset + 4:offset + length]
+        offset += (length + 3) & ~3
+    return attrs
+    
+def parse_netlink(data):
+    """Yield (message type, header fields, attributes) for each link/address message in a datagram."""
+    offset = 0
+    while offset + 16 <= len(data):
+        length, msg_type = struct.unpack_from("IH", data, offset)
+        if length < 16:
+            break
+        body = data[offset + 16:offset + length]
+        if msg_type in (RTM_NEWLINK, RTM_DELLINK) and len(body) >= 16:
+            _, _, _, index, flags, _ = struct.unpack_from("BBHiII", body)
+            yield msg_type, {"index": index, "flags": flags}, parse_rtattrs(body, 16)
+        elif msg_type in (RTM_NEWADDR, RTM_DELADDR) and len(body) >= 8:
+            family, prefixlen, _, _, index = struct.unpack_from("BBBBI", body)
+            yield msg_type, {"index": index, "family": family, "prefixlen": prefixlen}, parse_rtattrs(body, 8)
+        offset += (length + 3) & ~3
+        
+def event_table():
+    """Seed the incremental interface table (keyed by ifindex) from one link-table pass."""
+    return {
+        link["ifindex"]: {"name": name, "operstate": link["operstate"], "mtu": link["mtu"],
+                          "addrs": set(link["ipv4"]) | set(link["ipv6"])}
+        for name, link in get_link_table(refresh=True).items() if link.get("ifindex")
+    }
+    
+def apply_event(table, flaps, msg_type, header, attrs, now):
+    """Apply one netlink message to the table; returns only the changes it caused."""
+    index = header["index"]
+    entry = table.get(index)
+    events = []
+    
+    def event(name, kind, detail):
+        events.append({"time": now, "interface": name, "event": kind, "detail": detail,
+                       "flaps": len(flaps.get(index, ()))})
+        
+    if msg_type == RTM_DELLINK:
+        if entry:
+            del table[index]
+            flaps.pop(index, None)
+            event(entry["name"], "removed", "removed")
+        return events
+        
+    if msg_type == RTM_NEWLINK:
+        name = attrs[IFLA_IFNAME].rstrip(b"\0").decode() if IFLA_IFNAME in attrs else str(index)
+        state = entry["operstate"] if entry else "UNKNOWN"
+        if IFLA_OPERSTATE in attrs and attrs[IFLA_OPERSTATE][0] < len(OPER_STATES):
+            state = OPER_STATES[attrs[IFLA_OPERSTATE][0]]
+        mtu = struct.unpack("I", attrs[IFLA_MTU][:4])[0] if IFLA_MTU in attrs else None
+        if entry is None:
+            table[index] = {"name": name, "operstate": state, "mtu": mtu, "addrs": set()}
+            event(name, "added", f"added ({state})")
+            return events
+        if name != entry["name"]:
+            event(name, "renamed", f"renamed from {entry['name']}")
+            entry["name"] = name
+        if state != entry["operstate"]:
+            if entry["operstate"] == "UP":
+                # Every drop from UP counts as a flap within the sliding window
+                history = flaps.setdefault(index, [])
+                history.append(now)
+            entry["operstate"] = state
+            event(name, "state", state)
+        if mtu and mtu != entry["mtu"]:
+            event(name, "mtu", f"MTU {entry['mtu']}->{mtu}")
+            entry["mtu"] = mtu
+        return events
+        
+    # Address add/remove
+    family = socket.AF_INET if header["family"] == socket.AF_INET else socket.AF_INET6
+    raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS) if family == socket.AF_INET else attrs.get(IFA_ADDRESS)
+    if not entry or not raw:
+        return events
+    address = socket.inet_ntop(family, raw)
+    if msg_type == RTM_NEWADDR and address not in entry["addrs"]:
+        entry["addrs"].add(address)
+        event(entry["name"], "address", f"+{address}/{header['prefixlen']}")
+    elif msg_type == RTM_DELADDR and address in entry["addrs"]:
+        entry["addrs"].discard(address)
+        event(entry["name"], "address", f"-{address}/{header['prefixlen']}")
+    return events
+    
+def format_event(ev, window):
+    """One event line, e.g. "eno2 DOWN 12:03:44.112, flapped 3x in 60s"."""
+    stamp = time.strftime("%H:%M:%S", time.localtime(ev["time"])) + f".{int(ev['time'] * 1000) % 1000:03d}"
+    color = GREEN if ev["detail"] == "UP" else RED if ev["event"] in ("state", "removed") else YELLOW
+    line = f"{color}{ev['interface']} {ev['detail']}{RESET} {stamp}"
+    if ev["event"] == "state" and ev["flaps"] > 1:
+        line += f", {RED}flapped {ev['flaps']}x in {window:g}s{RESET}"
+    return line
+    
+def monitor_events(window=60, as_json=False):
+    """Subscribe to rtnetlink link/address groups and print changes as they happen."""
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+    host = socket.gethostname()
+    table, flaps = event_table(), {}
+    try:
+        while True:
+            # Blocks in the kernel until something changes: no polling, no CPU when idle
             try:
-                # Interface Type (without color for logic)
-                itype = get_interface_type(interface, with_color=False)
-                
-                # Get color for header
-                color = get_interface_color(interface, itype)
-                
-                # Print colored header
-                print(f"\n{color}{BOLD}{interface} {'='*(25-len(interface))}{RESET}")
-                
-                # Interface Type (with color)
-                itype_display = get_interface_type(interface, with_color=True)
-                print(f"  Type:       {itype_display}")
-                
-                # Status (with color)
-                status = get_interface_status(interface, with_color=True)
-                print(f"  Status:     {status}")
-                
-                # MAC Address
-                mac = get_mac_address(interface)
-                print(f"  MAC:        {mac}")
-                
-                # IP Addresses
-                ip_addresses = get_ip_addresses(interface)
-                print(f"  IPv4:       {', '.join(ip_addresses['IPv4']) if ip_addresses['IPv4'] else 'None'}")
-                print(f"  IPv6:       {', '.join(ip_addresses['IPv6'][:1]) if ip_addresses['IPv6'] else 'None'}")
-                if len(ip_addresses['IPv6']) > 1:
-                    print(f"               ({len(ip_addresses['IPv6'])-1} more IPv6 addresses not shown)")
-                
-                # Link Speed
-                speed = get_link_speed(interface)
-                print(f"  Link Speed: {speed}")
-                
-                # Driver Info
-                driver = get_driver_info(interface)
-                print(f"  Driver:     {driver}")
-                
-            except Exception as e:
-                print(f"  {RED}Error gathering information for {interface}: {str(e)}{RESET}")
-            
+                data = sock.recv(1 << 16)
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                # Socket overrun: events were lost, rebuild the table from scratch
+                table = event_table()
+                continue
+            now = time.time()
+            events = []
+            for msg_type, header, attrs in parse_netlink(data):
+                history = flaps.get(header["index"])
+                if history:
+                    history[:] = [t for t in history if now - t <= window]
+                events += apply_event(table, flaps, msg_type, header, attrs, now)
+            if not events:
+                continue
+            if as_json:
+                out = [json.dumps({"host": host, **ev}) for ev in events]
+            else:
+                out = [format_event(ev, window) for ev in events]
+            sys.stdout.write("\n".join(out) + "\n")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+        
+# Netplan sections that declare interfaces, and the kind each one implies
+NETPLAN_SECTIONS = {"ethernets": "ethernet", "vlans": "vlan", "bridges": "bridge", "bonds": "bond"}
+NETPLAN_GLOB = "/etc/netplan/*.yaml"
+
+def yaml_load(stream):
+    """safe_load through libyaml when PyYAML was built with it (several times faster)."""
+    import yaml
+    return yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    
+def netplan_documents(doc):
+    """Yield the `network:` mappings in a document, unwrapping cloud-init `content: |` fragments."""
+    if not isinstance(doc, dict):
+        return
+    if isinstance(doc.get("network"), dict):
+        yield doc["network"]
+    elif isinstance(doc.get("content"), str):
+        yield from netplan_documents(yaml_load(doc["content"]))
+        
+def normalize_address(address):
+    """Canonical IP (no prefix) so fd00:0100::1/64 and fd00:100::1 compare equal."""
+    import ipaddress
+    try:
+        return ipaddress.ip_interface(str(address)).ip.compressed
+    except ValueError:
+        return str(address)
+        
+def load_netplan(paths):
+    """Build the intended-state model {name: spec} from netplan files, later files overriding earlier ones."""
+    try:
+        import yaml
+    except ImportError:
+        raise RuntimeError("PyYAML is required for --netplan (apt install python3-yaml)")
+    model, errors = {}, []
+    if not paths:
+        # An empty glob must not pass the gate as "nothing wrong"
+        errors.append({"interface": None, "severity": "error", "check": "files",
+                       "message": "no netplan files found"})
+    for path in sorted(paths, key=os.path.basename):
+        try:
+            with open(path) as f:
+                docs = list(netplan_documents(yaml_load(f)))
+        except (OSError, yaml.YAMLError) as e:
+            errors.append({"interface": None, "severity": "error", "check": "parse",
+                           "message": f"{path}: {str(e).splitlines()[0]}"})
+            continue
+        for network in docs:
+            for section, kind in NETPLAN_SECTIONS.items():
+                for name, conf in (network.get(section) or {}).items():
+                    conf = conf or {}
+                    spec = model.setdefault(name, {"name": name, "kind": kind})
+                    spec["file"] = os.path.basename(path)
+                    for key in ("mtu", "id", "link", "dhcp4", "dhcp6", "accept-ra"):
+                        if key in conf:
+                            spec[key] = conf[key]
+                    if "addresses" in conf:
+                        spec["addresses"] = [str(a) for a in conf["addresses"] or []]
+                    if "interfaces" in conf:
+                        spec["interfaces"] = list(conf["interfaces"] or [])
+                    if (conf.get("match") or {}).get("macaddress"):
+                        spec["macaddress"] = str(conf["match"]["macaddress"]).lower()
+                    if conf.get("set-name"):
+                        spec["set-name"] = conf["set-name"]
+    return model, errors
+    
+def validate_netplan(model):
+    """Static checks on the intended model alone (no live state needed)."""
+    findings = []
+    
+    def finding(name, severity, check, message):
+        findings.append({"interface": name, "severity": severity, "check": check, "message": message})
+        
+    owners, bridge_of = {}, {}
+    for name, spec in model.items():
+        for member in spec.get("interfaces", []):
+            bridge_of[member] = name
+    for name, spec in model.items():
+        for address in spec.get("addresses", []):
+            owners.setdefault(normalize_address(address), []).append(name)
+        if spec["kind"] == "vlan":
+            if not isinstance(spec.get("id"), int) or not 1 <= spec["id"] <= 4094:
+                finding(name, "error", "vlan-id", f"VLAN id {spec.get('id')!r} is not in 1-4094")
+            parent = model.get(spec.get("link"))
+            if not parent:
+                finding(name, "error", "vlan-link", f"link {spec.get('link')!r} is not declared")
+            elif spec.get("mtu") and parent.get("mtu") and spec["mtu"] > parent["mtu"]:
+                finding(name, "error", "mtu", f"MTU {spec['mtu']} exceeds parent {parent['name']} MTU {parent['mtu']}")
+        if spec["kind"] in ("bridge", "bond"):
+            if not spec.get("interfaces"):
+                finding(name, "warning", "members", f"{spec['kind']} declares no member interfaces")
+            for member in spec.get("interfaces", []):
+                if member not in model:
+                    finding(name, "error", "members", f"member {member} is not declared")
+                elif model[member].get("addresses"):
+                    finding(member, "warning", "addresses", f"carries addresses but is a member of {name}")
+    for address, names in owners.items():
+        # A member sharing its bridge's address is already reported above
+        if len(names) == 2 and (bridge_of.get(names[0]) == names[1] or bridge_of.get(names[1]) == names[0]):
+            continue
+        if len(names) > 1:
+            finding(names[0], "warning", "duplicate-address", f"{address} is also assigned to {', '.join(names[1:])}")
+    return findings
+    
+def diff_netplan(model, links=None):
+    """Compare the intended model with the live link table; returns findings."""
+    import ipaddress
+    links = links if links is not None else get_link_table()
+    by_mac = {link["mac"]: name for name, link in links.items() if link.get("mac")}
+    members = {}
+    for name, link in links.items():
+        if link.get("master"):
+            members.setdefault(link["master"], []).append(name)
+    findings = []
+    
+    def finding(name, severity, check, message):
+        findings.append({"interface": name, "severity": severity, "check": check, "message": message})
+        
+    for name, spec in model.items():
+        # Ethernets matched by MAC may run under a different kernel name
+        live_name = spec.get("set-name") or name
+        if live_name not in links and spec.get("macaddress") in by_mac:
+            live_name = by_mac[spec["macaddress"]]
+        link = links.get(live_name)
+        if link is None:
+            finding(name, "error", "missing", f"{spec['kind']} not present on this host")
+            continue
+        if spec["kind"] in ("vlan", "bridge", "bond") and link.get("kind") not in (spec["kind"], "openvswitch"):
+            finding(name, "error", "kind", f"expected a {spec['kind']}, found {link.get('kind') or 'ethernet'}")
+        if spec["kind"] == "vlan" and link.get("kind") == "vlan":
+            if link.get("vlan_id") is not None and link["vlan_id"] != spec.get("id"):
+                finding(name, "error", "vlan-id", f"VLAN id {link['vlan_id']}, expected {spec.get('id')}")
+            if link.get("parent") and spec.get("link") and link["parent"] != spec["link"]:
+                finding(name, "error", "vlan-link", f"on {link['parent']}, expected {spec['link']}")
+        if spec.get("mtu") and link.get("mtu") and link["mtu"] != spec["mtu"]:
+            finding(name, "error", "mtu", f"MTU {link['mtu']}, expected {spec['mtu']}")
+        # OVS ports show master ovs-system in the kernel; their bridge membership lives in ovsdb
+        if spec["kind"] in ("bridge", "bond") and link.get("kind") != "openvswitch":
+            live_members = members.get(live_name, [])
+            if not live_members:
+                finding(name, "error", "members", f"{spec['kind']} has no member interfaces")
+            for member in spec.get("interfaces", []):
+                if member in links and member not in live_members:
+                    finding(name, "error", "members", f"{member} is not enslaved (master: {links[member].get('master') or 'none'})")
+        live = {normalize_address(a) for a in link["ipv4"] + link["ipv6"]}
+        for address in spec.get("addresses", []):
+            if normalize_address(address) not in live:
+                family = "IPv6" if ":" in address else "IPv4"
+                finding(name, "error", "address", f"missing {family} address {address}")
+        if (spec.get("dhcp6") or spec.get("accept-ra")) and not any(
+                not ipaddress.ip_address(a).is_link_local for a in link["ipv6"]):
+            finding(name, "warning", "address", "dhcp6/accept-ra set but no global IPv6 address")
+        if link.get("operstate") == "DOWN":
+            finding(name, "warning", "state", "link is DOWN")
+    return findings
+    
+def check_netplan(paths):
+    """Parse, validate and diff netplan files against this host; returns the findings report."""
+    model, findings = load_netplan(paths)
+    findings += validate_netplan(model) + diff_netplan(model)
+    return {"host": socket.gethostname(), "files": [os.path.basename(p) for p in sorted(paths)],
+            "interfaces": sorted(model), "findings": findings}
+    
+def render_netplan(report):
+    """Text report of netplan findings, grouped by interface."""
+    out = [f"{BOLD}Netplan vs live state{RESET} ({', '.join(report['files']) or 'no files'})"]
+    by_name = {}
+    for f in report["findings"]:
+        by_name.setdefault(f["interface"], []).append(f)
+    for f in by_name.pop(None, []):
+        out.append(f"  {RED}✗ {f['message']}{RESET}")
+    for name in report["interfaces"] + sorted(n for n in by_name if n not in report["interfaces"]):
+        issues = sorted(by_name.get(name, []), key=lambda f: f["severity"] != "error")
+        if not issues:
+            out.append(f"  {GREEN}✓{RESET} {name}")
+            continue
+        for f in issues:
+            color, mark = (RED, "✗") if f["severity"] == "error" else (YELLOW, "!")
+            out.append(f"  {color}{mark}{RESET} {name}: {color}{f['message']}{RESET}")
+    errors = sum(f["severity"] == "error" for f in report["findings"])
+    warnings = len(report["findings"]) - errors
+    out.append(f"{BOLD}{errors} error(s), {warnings} warning(s){RESET}")
+    return out
+    
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Network interfaces information")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--json", action="store_true", help="emit one JSON document for the host")
+    mode.add_argument("--ndjson", action="store_true", help="emit one JSON object per interface")
+    parser.add_argument("--watch", type=float, metavar="INTERVAL",
+                        help="sample throughput/error rates every INTERVAL seconds")
+    parser.add_argument("--events", action="store_true",
+                        help="follow link-state and address changes via rtnetlink")
+    parser.add_argument("--flap-window", type=float, default=60, metavar="SECONDS",
+                        help="window for counting link flaps in --events mode")
+    parser.add_argument("--netplan", nargs="*", metavar="FILE",
+                        help=f"diff netplan files (default {NETPLAN_GLOB}) against live state; exits 1 on errors")
+    parser.add_argument("--profile", type=int, nargs="?", const=10, metavar="N",
+                        help="at exit, show the N slowest/most costly external commands")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write every external command (argv, duration, exit, bytes) to FILE as JSON")
+    args = parser.parse_args(argv)
+    
+    if args.profile or args.trace:
+        global PROFILE
+        PROFILE = []
+        atexit.register(finish_profile, args.profile, args.trace)
+        
+    if args.watch:
+        watch(args.watch, as_json=args.json or args.ndjson)
+        return
+        
+    if args.events:
+        monitor_events(args.flap_window, as_json=args.json or args.ndjson)
+        return
+        
+    if args.netplan is not None:
+        try:
+            report = check_netplan(args.netplan or glob.glob(NETPLAN_GLOB))
+        except RuntimeError as e:
+            sys.stdout.write(f"{RED}Error: {str(e)}{RESET}\n")
+            return 2
+        if args.json:
+            out = [json.dumps(report)]
+        elif args.ndjson:
+            out = [json.dumps({"host": report["host"], **f}) for f in report["findings"]]
+        else:
+            out = render_netplan(report)
+        sys.stdout.write("\n".join(out) + "\n" if out else "")
+        # Usable as a pre-deploy gate: non-zero when anything is wrong
+        return 1 if any(f["severity"] == "error" for f in report["findings"]) else 0
+        
+    try:
+        report = collect()
     except Exception as e:
-        print(f"{RED}Error: {str(e)}{RESET}")
+        sys.stdout.write(f"{RED}Error: {str(e)}{RESET}\n")
+        return
+        
+    if args.json:
+        out = [json.dumps(report)]
+    elif args.ndjson:
+        out = [json.dumps({"host": report["host"], **rec}) for rec in report["interfaces"]]
+    else:
+        out = render(report)
+    # Buffered: the whole report goes out in a single write
+    sys.stdout.write("\n".join(out) + "\n")
         
 if __name__ == "__main__":
-    main()
-
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Run the storage and network checks across a fleet and merge the results.
+
+Each host gets one multiplexed SSH master connection; storage_check.py and
+network_interfaces.py are streamed to the remote python3 over stdin and run
+concurrently through that master, so nothing has to be installed on the
+targets. Hosts are processed in parallel up to --parallel at a time.
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECKS = {
+    "storage": os.path.join(ROOT, "Storage", "storage_check.py"),
+    "network": os.path.join(ROOT, "Network", "network_interfaces.py"),
+}
+
+# ANSI colors
+RED = "\033[38;5;208m"
+GREEN = "\033[38;5;118m"
+YELLOW = "\033[38;5;3m"
+RESET = "\033[0m"
+BOLD = "\033[1m"
+
+
+def juju_hosts(user):
+    """Targets for every machine in the current Juju model."""
+    result = subprocess.run(["juju", "machines", "--format=json"], check=True, text=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    hosts = []
+    for machine in json.loads(result.stdout).get("machines", {}).values():
+        address = machine.get("dns-name") or (machine.get("ip-addresses") or [None])[0]
+        if address:
+            hosts.append(f"{user}@{address}" if user else address)
+    return hosts
+
+
+def read_hosts(path):
+    """Hosts from a file, one per line; blank lines and # comments ignored."""
+    with open(path) as f:
+        return [line.split("#")[0].strip() for line in f if line.split("#")[0].strip()]
+
+
+class SSHTransport:
+    """Pooled SSH: one ControlMaster per host, every command multiplexed over it."""
+
+    def __init__(self, ssh="ssh", connect_timeout=10, options=()):
+        self.ssh = ssh
+        self.control_dir = tempfile.mkdtemp(prefix="fleet-ssh-")
+        self.options = ["-o", "BatchMode=yes", "-o", f"ConnectTimeout={connect_timeout}",
+                        "-o", f"ControlPath={self.control_dir}/%C", *options]
+
+    def open(self, host, timeout):
+        # stderr goes to a file, not a pipe: before OpenSSH 8.7 the backgrounded (-f) master keeps
+        # the inherited stderr open, and run() would wait for an EOF that never comes
+        with tempfile.TemporaryFile() as err:
+            try:
+                subprocess.run([self.ssh, *self.options, "-o", "ControlMaster=yes", "-o", "ControlPersist=yes",
+                                "-f", "-N", host], check=True, timeout=timeout,
+                               stdout=subprocess.DEVNULL, stderr=err)
+            except subprocess.SubprocessError as e:
+                err.seek(0)
+                e.stderr = err.read()
+                self.close(host)
+                raise
+
+    def command(self, host, argv):
+        return [self.ssh, *self.options, "-o", "ControlMaster=no", host, *argv]
+
+    def close(self, host):
+        subprocess.run([self.ssh, *self.options, "-O", "exit", host],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def shutdown(self):
+        shutil.rmtree(self.control_dir, ignore_errors=True)
+
+
+class LocalTransport:
+    """Runs the checks on this machine under each host label (stand-in hosts for testing)."""
+
+    def open(self, host, timeout):
+        pass
+
+    def command(self, host, argv):
+        return argv
+
+    def close(self, host):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+def check_host(transport, host, scripts, python, timeout):
+    """Run every check on one host concurrently; returns the host's merged record."""
+    record = {"host": host, "errors": []}
+    try:
+        transport.open(host, timeout)
+    except (subprocess.SubprocessError, OSError) as e:
+        stderr = getattr(e, "stderr", None)
+        record["errors"].append(f"connect: {stderr.decode().strip() if stderr else e}")
+        return record
+    try:
+        # Both checks share the host's master connection and run side by side
+        with ThreadPoolExecutor(max_workers=len(scripts)) as pool:
+            runs = {name: pool.submit(subprocess.run, transport.command(host, [python, "-", "--json"]), input=source,
+                                      stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+                    for name, source in scripts.items()}
+        for name, run in runs.items():
+            try:
+                result = run.result()
+                record[name] = json.loads(result.stdout)
+            except subprocess.TimeoutExpired:
+                record["errors"].append(f"{name}: timed out after {timeout:g}s")
+            except ValueError:
+                record["errors"].append(f"{name}: exit {result.returncode}: {result.stderr.decode().strip()[-200:]}")
+            except OSError as e:
+                record["errors"].append(f"{name}: {e}")
+    finally:
+        transport.close(host)
+    return record
+
+
+def sweep(hosts, transport, python="python3", parallel=32, timeout=60, checks=CHECKS):
+    """Check all hosts with at most `parallel` in flight; returns the merged report."""
+    scripts = {}
+    for name, path in checks.items():
+        with open(path, "rb") as f:
+            scripts[name] = f.read()
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(hosts)))) as pool:
+        records = list(pool.map(lambda h: check_host(transport, h, scripts, python, timeout), hosts))
+    return {"hosts": records, "summary": summarize(records)}
+
+
+def summarize(records):
+    """Fleet-wide roll-up of the per-host records."""
+    summary = {"hosts": len(records), "unreachable": 0, "drives": 0, "failed_drives": [],
+               "interfaces": 0, "down_interfaces": 0}
+    for rec in records:
+        if "storage" not in rec and "network" not in rec:
+            summary["unreachable"] += 1
+        for drive in rec.get("storage", {}).get("drives", []):
+            summary["drives"] += 1
+            if drive["health"]["health"] == "FAILED":
+                summary["failed_drives"].append(f"{rec['host']}:{drive['device']}")
+        for iface in rec.get("network", {}).get("interfaces", []):
+            summary["interfaces"] += 1
+            summary["down_interfaces"] += iface.get("status") == "DOWN"
+    return summary
+
+
+def render(report):
+    """Text table: one line per host, then the fleet summary."""
+    out = [f"{BOLD}{'Host':<32}{'Drives':>7}{'Failed':>7} {'Tiers':<39} {'Ifaces':>7}{'Down':>6}  Status{RESET}"]
+    for rec in report["hosts"]:
+        drives = rec.get("storage", {}).get("drives", [])
+        ifaces = rec.get("network", {}).get("interfaces", [])
+        failed = sum(d["health"]["health"] == "FAILED" for d in drives)
+        tiers = {}
+        for d in drives:
+            tiers[d["tier"]] = tiers.get(d["tier"], 0) + 1
+        tier_str = ", ".join(f"{n}x {t}" for t, n in tiers.items())
+        down = sum(i.get("status") == "DOWN" for i in ifaces)
+        status = f"{RED}{'; '.join(rec['errors'])}{RESET}" if rec["errors"] else f"{GREEN}OK{RESET}"
+        out.append(f"{rec['host'][:31]:<32}{len(drives):>7}{RED if failed else ''}{failed:>7}{RESET}"
+                   f" {tier_str[:39]:<39} {len(ifaces):>7}{YELLOW if down else ''}{down:>6}{RESET}  {status}")
+    s = report["summary"]
+    out.append(f"\n{BOLD}{s['hosts']} hosts{RESET}: {s['unreachable']} unreachable, {s['drives']} drives "
+               f"({len(s['failed_drives'])} failed), {s['interfaces']} interfaces ({s['down_interfaces']} down)")
+    for drive in s["failed_drives"]:
+        out.append(f"  {RED}FAILED{RESET} {drive}")
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fleet-wide storage/network checks over pooled SSH")
+    parser.add_argument("hosts", nargs="*", help="hosts to check ([user@]host)")
+    parser.add_argument("-f", "--hosts-file", help="file with one host per line")
+    parser.add_argument("--juju", action="store_true", help="check every machine in the current Juju model")
+    parser.add_argument("--user", default="ubuntu", help="SSH user for --juju machines")
+    parser.add_argument("--parallel", type=int, default=32, help="hosts checked concurrently")
+    parser.add_argument("--timeout", type=float, default=120, help="per-host connect and per-check timeout (seconds)")
+    parser.add_argument("--python", default="python3", help="python interpreter on the targets")
+    parser.add_argument("--transport", choices=("ssh", "local"), default="ssh",
+                        help="'local' runs the checks on this machine for each host label")
+    parser.add_argument("--ssh", default="ssh", help="ssh client binary")
+    parser.add_argument("--json", action="store_true", help="emit the merged report as JSON")
+    args = parser.parse_args(argv)
+
+    hosts = list(args.hosts)
+    if args.hosts_file:
+        hosts += read_hosts(args.hosts_file)
+    if args.juju:
+        hosts += juju_hosts(args.user)
+    if not hosts:
+        parser.error("no hosts given (positional, --hosts-file or --juju)")
+
+    transport = LocalTransport() if args.transport == "local" else SSHTransport(args.ssh)
+    try:
+        report = sweep(hosts, transport, args.python, args.parallel, args.timeout)
+    finally:
+        transport.shutdown()
+    out = [json.dumps(report)] if args.json else render(report)
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Resident storage/network collector serving Prometheus metrics.
+
+SMART health, drive inventory and interface details are refreshed on a slow
+cadence; disk and interface counters on a fast one. Each refresh renders the
+exposition text once, and /metrics just returns the latest snapshot, so a
+scrape never runs a subprocess.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "Storage"), os.path.join(ROOT, "Network")]
+
+import storage_check
+import network_interfaces
+
+HEALTH_FIELDS = (
+    ("temp", "drive_temperature_celsius", "Drive temperature"),
+    ("wear", "drive_wear_percent", "Percentage of rated endurance used"),
+    ("spare", "drive_available_spare_percent", "NVMe available spare"),
+    ("written", "drive_written_bytes_total", "Bytes written over the drive lifetime"),
+    ("power_on_hours", "drive_power_on_hours", "Power-on hours"),
+    ("errors", "drive_media_errors_total", "NVMe media and data integrity errors"),
+    ("reallocated", "drive_reallocated_sectors", "Reallocated sector count"),
+)
+
+DISK_COUNTERS = (
+    (0, 1, "disk_io_total", "Completed reads and writes"),
+    (1, 512, "disk_bytes_total", "Bytes read and written"),
+    (2, 0.001, "disk_io_time_seconds_total", "Time spent on reads and writes"),
+    (4, 0.001, "disk_busy_seconds_total", "Time the device had I/O in flight"),
+    (5, 0.001, "disk_weighted_io_seconds_total", "Weighted time spent doing I/O (queue depth integral)"),
+)
+
+
+def escape(value):
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def family(out, name, mtype, help_text, samples):
+    """Append one metric family; samples are (labels dict, value) pairs."""
+    out.append(f"# HELP openstack_{name} {help_text}")
+    out.append(f"# TYPE openstack_{name} {mtype}")
+    for labels, value in samples:
+        label_str = ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+        out.append(f"openstack_{name}{{{label_str}}} {value}")
+
+
+class Collector:
+    """Holds the latest collected state and the rendered /metrics snapshot."""
+
+    def __init__(self, smart_interval, counter_interval):
+        self.smart_interval = smart_interval
+        self.counter_interval = counter_interval
+        self.storage = {"drives": []}
+        self.network = {"interfaces": []}
+        self.diskstats = {}
+        self.netstats = {}
+        self.refreshed = {}
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.snapshot = b""
+
+    def refresh_slow(self):
+        """Inventory, SMART health and interface details (spawns subprocesses)."""
+        started = time.monotonic()
+        storage = storage_check.collect(ttl=self.smart_interval)
+        network_interfaces.get_link_table(refresh=True)
+        network = network_interfaces.collect()
+        with self.lock:
+            self.storage, self.network = storage, network
+            self.refreshed["smart"] = (time.time(), time.monotonic() - started)
+
+    def refresh_fast(self):
+        """Disk and interface counters (file reads only)."""
+        started = time.monotonic()
+        diskstats = storage_check.read_diskstats()
+        netstats = network_interfaces.read_counters()
+        with self.lock:
+            self.diskstats, self.netstats = diskstats, netstats
+            self.refreshed["counters"] = (time.time(), time.monotonic() - started)
+
+    def render(self):
+        """Render the full exposition text and swap it in as the current snapshot."""
+        with self.lock:
+            drives, interfaces = self.storage["drives"], self.network["interfaces"]
+            diskstats, netstats, refreshed = self.diskstats, self.netstats, dict(self.refreshed)
+        out = []
+
+        family(out, "drive_info", "gauge", "Drive inventory and tier classification", [
+            ({"device": d["device"], "model": d["model"], "serial": d["serial"] or "", "tier": d["tier"]}, 1)
+            for d in drives])
+        family(out, "drive_size_bytes", "gauge", "Drive capacity", [
+            ({"device": d["device"]}, d["size"]) for d in drives])
+        family(out, "drive_smart_passed", "gauge", "SMART overall health (1 passed, 0 failed)", [
+            ({"device": d["device"]}, int(d["health"].health == "PASSED"))
+            for d in drives if d["health"].health in ("PASSED", "FAILED")])
+        # Last-known values of a sleeping drive are not current samples; only their age is exported
+        family(out, "drive_smart_stale_seconds", "gauge", "Age of the last-known SMART values of a drive in standby", [
+            ({"device": d["device"]}, d["health"].stale) for d in drives if d["health"].stale is not None])
+        for field, name, help_text in HEALTH_FIELDS:
+            mtype = "counter" if name.endswith("_total") else "gauge"
+            family(out, name, mtype, help_text, [
+                ({"device": d["device"]}, getattr(d["health"], field))
+                for d in drives if getattr(d["health"], field) is not None and d["health"].stale is None])
+
+        disk_names = {d["name"]: d for d in drives}
+        disk_rows = [(disk_names[name], stats) for name, stats in diskstats.items() if name in disk_names]
+        for index, scale, name, help_text in DISK_COUNTERS:
+            family(out, name, "counter", help_text, [
+                ({"device": d["device"], "tier": d["tier"]}, stats[index] * scale) for d, stats in disk_rows])
+        family(out, "disk_io_in_flight", "gauge", "I/O requests currently in flight", [
+            ({"device": d["device"], "tier": d["tier"]}, stats[3]) for d, stats in disk_rows])
+
+        up = [i for i in interfaces if "error" not in i]
+        family(out, "net_info", "gauge", "Interface classification", [
+            ({"interface": i["name"], "type": i["type"], "kind": i["kind"] or "", "driver": i["driver"], "mac": i["mac"]}, 1)
+            for i in up])
+        family(out, "net_up", "gauge", "Interface operational state (1 up)", [
+            ({"interface": i["name"]}, int(i["status"] == "UP")) for i in up])
+        family(out, "net_speed_bits_per_second", "gauge", "Negotiated link speed", [
+            ({"interface": i["name"]}, i["speed_mbps"] * 1000000) for i in up if i["speed_mbps"]])
+        family(out, "net_mtu_bytes", "gauge", "Interface MTU", [
+            ({"interface": i["name"]}, i["mtu"]) for i in up if i["mtu"]])
+        for index, counter in enumerate(network_interfaces.COUNTERS):
+            family(out, f"net_{counter}_total", "counter", f"Interface {counter.replace('_', ' ')} counter", [
+                ({"interface": name}, values[index]) for name, values in netstats.items()])
+
+        family(out, "collector_last_refresh_timestamp_seconds", "gauge", "Unix time of the last refresh", [
+            ({"collector": name}, stamp) for name, (stamp, _) in refreshed.items()])
+        family(out, "collector_refresh_duration_seconds", "gauge", "Duration of the last refresh", [
+            ({"collector": name}, round(duration, 6)) for name, (_, duration) in refreshed.items()])
+
+        self.snapshot = ("\n".join(out) + "\n").encode()
+
+    def loop(self, refresh, interval):
+        """Run refresh every interval until stopped, re-rendering after each pass."""
+        while not self.stop.wait(interval):
+            try:
+                refresh()
+                self.render()
+            except Exception as e:
+                sys.stderr.write(f"{refresh.__name__} failed: {e}\n")
+
+    def start(self):
+        """Prime both collectors, then keep them refreshing in background threads."""
+        self.refresh_fast()
+        self.refresh_slow()
+        self.render()
+        for refresh, interval in ((self.refresh_slow, self.smart_interval), (self.refresh_fast, self.counter_interval)):
+            threading.Thread(target=self.loop, args=(refresh, interval), daemon=True).start()
+
+
+def make_handler(collector):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = collector.snapshot
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Storage/network collector exposing Prometheus metrics")
+    parser.add_argument("--listen", default="0.0.0.0:9469", help="address:port to serve /metrics on")
+    parser.add_argument("--smart-interval", type=float, default=300, help="seconds between SMART/inventory refreshes")
+    parser.add_argument("--counter-interval", type=float, default=15, help="seconds between counter refreshes")
+    args = parser.parse_args(argv)
+
+    host, _, port = args.listen.rpartition(":")
+    collector = Collector(args.smart_interval, args.counter_interval)
+    collector.start()
+    server = ThreadingHTTPServer((host or "0.0.0.0", int(port)), make_handler(collector))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        collector.stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
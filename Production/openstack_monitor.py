@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""OpenStack monitoring & status report (asyncio version of openstack-monitor.sh).
+
+`juju status --format=json` is fetched once for the whole model and every
+service check reads from that in-memory index instead of calling juju per
+service. The OpenStack API listings and the local system commands don't
+depend on each other, so they all run concurrently, each under its own
+timeout; sections are printed in the original order as their data arrives.
+"""
+import os
+import re
+import sys
+import json
+import signal
+import shutil
+import asyncio
+import argparse
+
+# ANSI colors (same palette as openstack-monitor.sh)
+RED = "\033[0;31m"
+GREEN = "\033[0;32m"
+YELLOW = "\033[1;33m"
+BLUE = "\033[0;34m"
+CYAN = "\033[0;36m"
+BOLD = "\033[1m"
+NC = "\033[0m"
+
+CORE_SERVICES = (
+    "mysql", "rabbitmq-server", "keystone", "glance", "nova-cloud-controller",
+    "nova-compute", "neutron-api", "neutron-gateway", "cinder", "horizon",
+)
+
+ADDITIONAL_SERVICES = (
+    "skyline", "trove", "swift-proxy", "swift-storage", "manila", "zun",
+    "octavia", "designate", "freezer", "kitti", "ironic-api", "ironic-conductor",
+)
+
+API_SECTIONS = (
+    ("SERVICE CATALOG", ["service", "list"]),
+    ("COMPUTE SERVICES", ["compute", "service", "list"]),
+    ("VOLUME SERVICES", ["volume", "service", "list"]),
+    ("NETWORK AGENTS", ["network", "agent", "list"]),
+    ("HYPERVISORS", ["hypervisor", "list"]),
+)
+
+RESOURCE_LISTINGS = (
+    ("Images", ["image", "list"]),
+    ("Flavors", ["flavor", "list"]),
+    ("Networks", ["network", "list"]),
+    ("Volumes", ["volume", "list"]),
+    ("Instances", ["server", "list"]),
+)
+
+SYSTEM_COMMANDS = {
+    "lvs": ["sudo", "lvs"],
+    "vgs": ["sudo", "vgs"],
+    "df": ["df", "-h"],
+    "top": ["top", "-bn1"],
+    "free": ["free", "-h"],
+    "iostat": ["iostat", "-xh", "1", "1"],
+}
+
+LOG_FILES = (
+    ("keystone", "/var/log/keystone/keystone.log"),
+    ("nova-api", "/var/log/nova/nova-api.log"),
+    ("glance-api", "/var/log/glance/glance-api.log"),
+    ("neutron-server", "/var/log/neutron/neutron-server.log"),
+    ("cinder-api", "/var/log/cinder/cinder-api.log"),
+    ("horizon", "/var/log/apache2/horizon_error.log"),
+)
+
+DATA_MOUNTS = re.compile(r"/var/lib/(database|messaging|compute|network|dashboard|storage|identity|backup)")
+LOG_LEVELS = re.compile(r"ERROR|CRITICAL|WARNING|FATAL")
+BANNER = "╔═══════════════════════════════════════════════════════╗"
+
+
+def emit(*lines):
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+
+def header(title):
+    rule = f"{BOLD}{BLUE}=============================================={NC}"
+    emit("", rule, f"{BOLD}{BLUE}   {title}{NC}", rule, "")
+
+
+def section(title):
+    emit("", f"{BOLD}{CYAN}{title}{NC}", f"{CYAN}{'=' * len(title)}{NC}", "")
+
+
+def success(msg):
+    emit(f"{GREEN}✓ {msg}{NC}")
+
+
+def warning(msg):
+    emit(f"{YELLOW}⚠ {msg}{NC}")
+
+
+def error(msg):
+    emit(f"{RED}✗ {msg}{NC}")
+
+
+def banner(text):
+    emit(f"{BOLD}{GREEN}{BANNER}", "║" + " " * 55 + "║", f"║       {text:<48}║", "║" + " " * 55 + "║",
+         BANNER.replace("╔", "╚").replace("╗", "╝") + NC)
+
+
+async def run(argv, timeout, env=None):
+    """Run a command; returns (exit code, output). Exit code is None on timeout or spawn failure."""
+    try:
+        proc = await asyncio.create_subprocess_exec(*argv, env=env, stdin=asyncio.subprocess.DEVNULL,
+                                                    stdout=asyncio.subprocess.PIPE,
+                                                    stderr=asyncio.subprocess.STDOUT, start_new_session=True)
+    except OSError as e:
+        return None, str(e)
+    try:
+        out, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        # Kill the whole group so grandchildren can't hold the pipe open; it may have just exited
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+        return None, f"{' '.join(argv)}: timed out after {timeout:g}s"
+    return proc.returncode, out.decode(errors="replace")
+
+
+async def show(task, keep=None):
+    """Print a command's output (only lines passing keep, if given), or its failure in red."""
+    code, out = await task
+    if code is None:
+        error(out)
+    elif keep:
+        lines = [line for line in out.splitlines() if keep(line)]
+        if lines:
+            emit(*lines)
+    elif out.strip():
+        emit(out.rstrip("\n"))
+
+
+async def admin_env(path, timeout):
+    """Environment after sourcing an openrc file, or None if it is missing or fails."""
+    if not os.path.isfile(path):
+        return None
+    code, out = await run(["bash", "-c", 'source "$1" >/dev/null 2>&1 && env -0', "bash", path], timeout)
+    if code != 0:
+        return None
+    return dict(item.split("=", 1) for item in out.split("\0") if "=" in item)
+
+
+def short_status(status):
+    """`juju status --format=short` lines, built from the JSON status."""
+    lines = []
+    for app in sorted(status.get("applications", {})):
+        for unit, info in sorted(status["applications"][app].get("units", {}).items()):
+            ports = " ".join(info.get("open-ports", []))
+            lines.append(f"- {unit}: {info.get('public-address', '')} (agent:{info.get('juju-status', {}).get('current')},"
+                         f" workload:{info.get('workload-status', {}).get('current')}) {ports}".rstrip())
+    return lines
+
+
+def relation_lines(app):
+    """One line per endpoint: "endpoint: app, app"."""
+    lines = []
+    for endpoint, peers in sorted(app.get("relations", {}).items()):
+        # juju 2.x lists application names, 3.x lists {"related-application": ...} objects
+        names = [p["related-application"] if isinstance(p, dict) else p for p in peers]
+        lines.append(f"  {endpoint}: {', '.join(sorted(set(names)))}")
+    return lines
+
+
+def service_lines(name, app):
+    """Application and unit status/message lines plus relations for one service."""
+    lines = [f"\n{CYAN}Checking {name} status:{NC}"]
+    status = app.get("application-status", {})
+    lines.append(f"  status: {status.get('current', 'unknown')}")
+    if status.get("message"):
+        lines.append(f"  message: {status['message']}")
+    for unit, info in sorted(app.get("units", {}).items()):
+        workload = info.get("workload-status", {})
+        agent = info.get("juju-status", {}).get("current", "unknown")
+        message = f" - {workload['message']}" if workload.get("message") else ""
+        lines.append(f"  {unit}: {workload.get('current', 'unknown')} (agent {agent}){message}")
+    lines.append(f"{CYAN}{name} relations:{NC}")
+    lines += relation_lines(app) or ["  (none)"]
+    return lines
+
+
+def tail(path, n=10, chunk=65536):
+    """Last n lines of a file without reading all of it."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - chunk))
+        return f.read().decode(errors="replace").splitlines()[-n:]
+
+
+def cpu_usage(top_output):
+    """Busy CPU percentage from the Cpu(s) line of top -bn1."""
+    for line in top_output.splitlines():
+        match = re.search(r"([\d.]+)\s*id", line) if "Cpu(s)" in line else None
+        if match:
+            return f"{100 - float(match.group(1)):g}%"
+    return None
+
+
+async def monitor(args):
+    if not shutil.which("juju"):
+        error("Juju is not installed. Please install it first.")
+        return 1
+    openstack = shutil.which("openstack") is not None
+    if not openstack:
+        warning("OpenStack client is not installed. Some checks will be skipped.")
+
+    if sys.stdout.isatty():
+        sys.stdout.write("\033[H\033[2J")
+    emit("")
+    banner("OPENSTACK MONITORING & STATUS CHECKER")
+    emit("")
+
+    # Start everything that doesn't need credentials right away
+    timeout = args.timeout
+    start = lambda argv, env=None: asyncio.ensure_future(run(argv, timeout, env))
+    controllers = start(["juju", "controllers"])
+    juju_status = start(["juju", "status", "--format=json"])
+    system = {name: start(argv) for name, argv in SYSTEM_COMMANDS.items()}
+
+    env = await admin_env(os.path.expanduser(args.adminrc), timeout)
+    if env is not None:
+        success(f"Sourced OpenStack credentials from {args.adminrc}")
+    else:
+        warning("OpenStack credentials file not found. Some checks will be limited.")
+    if openstack:
+        api = {title: start(["openstack", *cmd], env) for title, cmd in API_SECTIONS}
+        resources = {title: start(["openstack", *cmd], env) for title, cmd in RESOURCE_LISTINGS}
+
+    header("JUJU DEPLOYMENT STATUS")
+    emit(f"{YELLOW}Checking Juju controller status...{NC}")
+    await show(controllers)
+    emit(f"\n{YELLOW}Checking overall model status...{NC}")
+    code, out = await juju_status
+    try:
+        status = json.loads(out) if code == 0 else {}
+    except ValueError:
+        code, status = None, {}
+    if code != 0:
+        error(f"juju status failed: {out.strip()[-200:]}")
+    applications = status.get("applications", {})
+    emit(*short_status(status))
+
+    # Baremetal listing depends on the model, so it can only start now
+    ironic = "ironic-api" in applications
+    if openstack and ironic:
+        baremetal = start(["openstack", "baremetal", "node", "list"], env)
+
+    header("OPENSTACK SERVICE STATUS")
+    section("CORE SERVICES")
+    for name in CORE_SERVICES:
+        if name in applications:
+            emit(*service_lines(name, applications[name]))
+        else:
+            emit(f"\n{CYAN}Checking {name} status:{NC}")
+            error(f"{name} not found in the model")
+    section("ADDITIONAL SERVICES")
+    for name in ADDITIONAL_SERVICES:
+        if name in applications:
+            emit(*service_lines(name, applications[name]))
+        else:
+            warning(f"{name} not deployed, skipping")
+
+    if openstack:
+        header("OPENSTACK API VERIFICATION")
+        for title, task in api.items():
+            section(title)
+            await show(task)
+        section("CURRENT RESOURCES")
+        for i, (title, task) in enumerate(resources.items()):
+            emit(f"{'' if i == 0 else chr(10)}{CYAN}{title}:{NC}")
+            await show(task)
+        if ironic:
+            emit(f"\n{CYAN}Baremetal Nodes:{NC}")
+            await show(baremetal)
+
+    header("SYSTEM RESOURCES")
+    section("STORAGE STATUS")
+    emit(f"{CYAN}Logical Volumes:{NC}")
+    await show(system["lvs"])
+    emit(f"\n{CYAN}Volume Groups:{NC}")
+    await show(system["vgs"])
+    emit(f"\n{CYAN}Mount Points:{NC}")
+    await show(system["df"], DATA_MOUNTS.search)
+
+    section("SYSTEM LOAD")
+    emit(f"{CYAN}CPU Usage:{NC}")
+    code, out = await system["top"]
+    if code is None:
+        error(out)
+    else:
+        emit(cpu_usage(out) or out.strip())
+    emit(f"\n{CYAN}Memory Usage:{NC}")
+    await show(system["free"])
+    emit(f"\n{CYAN}Disk I/O:{NC}")
+    await show(system["iostat"], lambda line: line.strip() and "avg-cpu" not in line)
+
+    header("RECENT LOG ENTRIES")
+    for service, path in LOG_FILES:
+        try:
+            lines = tail(path)
+        except OSError:
+            warning(f"Log file for {service} not found at {path}")
+        else:
+            emit(f"{CYAN}Recent logs for {service}:{NC}", *[l for l in lines if LOG_LEVELS.search(l)])
+        emit("")
+
+    header("MONITORING SUMMARY")
+    banner("OPENSTACK MONITORING COMPLETED")
+    emit("", f"{CYAN}Your OpenStack deployment has been checked.{NC}", "",
+         f"{YELLOW}To view specific logs from Juju services:{NC}",
+         " • juju debug-log -i <service-name>", "",
+         f"{YELLOW}To access the various dashboards:{NC}",
+         " • Horizon: http://<horizon-ip>/horizon",
+         " • Skyline: http://<skyline-ip>/",
+         " • Kitti: http://<kitti-ip>/", "",
+         f"{CYAN}Run this script periodically to monitor system health{NC}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenStack monitoring & status report")
+    parser.add_argument("--timeout", type=float, default=60, help="per-command timeout (seconds)")
+    parser.add_argument("--adminrc", default="~/adminrc", help="OpenStack credentials file to source")
+    args = parser.parse_args(argv)
+    try:
+        sys.exit(asyncio.run(monitor(args)))
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
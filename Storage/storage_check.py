@@ -1,15 +1,82 @@
 #!/usr/bin/env python3
-import os, re, subprocess, json
+import os, re, subprocess, json, signal, time, sys, socket, argparse, atexit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Colors
 RED, GREEN, YELLOW, BLUE, CYAN = "\033[38;5;208m", "\033[38;5;118m", "\033[38;5;3m", "\033[38;5;105m", "\033[38;5;33m"
 RESET, BOLD = "\033[0m", "\033[1m"
 
-def run_cmd(cmd):
+# SMART probes: per-drive deadline (seconds) and concurrency bound
+PROBE_TIMEOUT, PROBE_WORKERS = 15, 8
+# SMART results cache: lifetime (seconds) and location
+HEALTH_TTL = 3600
+# Oldest cached record shown (marked stale) for a drive that is asleep in standby
+HEALTH_STALE_MAX = 7 * 86400
+HEALTH_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "openstack-hostcheck", "smart.json")
+# SMART sample history (SQLite, one row per probe) and the wear-forecast lookback (days)
+HEALTH_HISTORY = os.path.join(os.path.dirname(HEALTH_CACHE), "smart-history.db")
+FORECAST_WINDOW = 180
+FORECAST_TIERS = ("Tier 1 (NVMe)", "Tier 2 (SSD)")
+STANDBY_RE = re.compile(r"(STANDBY|SLEEP) mode")
+PROC_DISKSTATS = "/proc/diskstats"
+SYS_BLOCK = "/sys/block"
+# Control plane selection: largest preferred size, wear ceiling (%), O_DIRECT reads per latency probe
+CP_MAX_SIZE, CP_WEAR_LIMIT, LATENCY_SAMPLES = 900 * 1024**3, 80, 64
+
+# Subprocess profile: None when off, else one record per command run
+PROFILE = None
+
+def run_cmd(cmd, timeout=None):
+    """Run a shell command; "" on failure, raises subprocess.TimeoutExpired past the deadline"""
+    started, code, out = time.monotonic(), None, ""
     try:
-        result = subprocess.run(cmd, shell=True, check=True, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return result.stdout.strip()
-    except: return ""
+        try:
+            proc = subprocess.Popen(cmd, shell=True, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+        except: return ""
+        try: out, _ = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            # Kill the whole process group (shell, sudo, smartctl) and don't wait on
+            # pipes a process stuck in D state may still hold open
+            for sig in (signal.SIGTERM, signal.SIGKILL):
+                try: os.killpg(proc.pid, sig)
+                except OSError: pass
+            for pipe in (proc.stdout, proc.stderr): pipe.close()
+            try: proc.wait(timeout=1)
+            except subprocess.TimeoutExpired: pass
+            code = "timeout"
+            raise
+        except: return ""
+        code = proc.returncode
+        return out.strip() if proc.returncode == 0 else ""
+    finally:
+        if PROFILE is not None:
+            PROFILE.append({"cmd": cmd, "start": started, "seconds": time.monotonic() - started, "exit": code, "bytes": len(out or "")})
+
+def profile_report(records, top=10):
+    """Slowest commands and the probes that dominate total time, as lines"""
+    if not records: return ["No external commands were run."]
+    groups = {}
+    for rec in records:
+        # One row per probe kind: smartctl on /dev/sda and /dev/sdb are the same probe
+        g = groups.setdefault(re.sub(r"/dev/(?!null)\S+", "/dev/*", rec["cmd"]), [0, 0.0, 0.0])
+        g[0] += 1; g[1] += rec["seconds"]; g[2] = max(g[2], rec["seconds"])
+    total = sum(r["seconds"] for r in records)
+    out = [f"{BOLD}External commands: {len(records)} run, {total:.3f}s total{RESET}",
+           f"{BOLD}{'count':>6}{'total s':>10}{'max s':>9}  probe{RESET}"]
+    for probe, (count, secs, worst) in sorted(groups.items(), key=lambda g: -g[1][1])[:top]:
+        out.append(f"{count:>6}{secs:>10.3f}{worst:>9.3f}  {probe}")
+    out.append(f"{BOLD}{'seconds':>9}{'exit':>9}{'bytes':>9}  slowest commands{RESET}")
+    for rec in sorted(records, key=lambda r: -r["seconds"])[:top]:
+        out.append(f"{rec['seconds']:>9.3f}{str(rec['exit']):>9}{rec['bytes']:>9}  {rec['cmd']}")
+    return out
+
+def finish_profile(top, trace):
+    """atexit hook: table to stderr (stdout may be JSON) and/or a JSON trace file"""
+    records = list(PROFILE)
+    base = min((r["start"] for r in records), default=0)
+    if trace:
+        with open(trace, "w") as f: json.dump([{**r, "start": r["start"] - base} for r in records], f)
+    if top: sys.stderr.write("\n".join(profile_report(records, top)) + "\n")
 
 def get_os_drive():
     output = run_cmd("df -h /")
@@ -17,234 +84,574 @@ def get_os_drive():
         if " /" in line: return line.split()[0]
     return None
 
-def is_os_drive(device):
-    os_drive = get_os_drive()
+OS_VGS = ("ubuntu-vg", "ubuntu--vg")
+OS_MOUNTS = ("/", "/boot", "/boot/efi")
+
+def fmt_size(size):
+    """Render a byte count the way `lsblk -o SIZE` does (931.5G, 1.8T)"""
+    size = float(size or 0)
+    for unit in "BKMGTP":
+        if size < 1024 or unit == "P": break
+        size /= 1024
+    return f"{size:.1f}".rstrip("0").rstrip(".") + (unit if unit != "B" else "")
+
+def walk(node, depth=0):
+    """Yield (depth, node) for every partition/LV below a block device"""
+    for child in node.get("children") or []:
+        yield depth, child
+        yield from walk(child, depth + 1)
+
+def mounts(node):
+    points = node.get("mountpoints") or [node.get("mountpoint")]
+    return [m for m in points if m]
+
+def get_inventory():
+    """One lsblk/pvs/df pass; every classifier and printer reads from this tree"""
+    try: tree = json.loads(run_cmd("lsblk --json -b -O") or "{}").get("blockdevices", [])
+    except ValueError: tree = []
+    pvs = {}
+    for line in run_cmd("sudo pvs --noheadings -o pv_name,vg_name 2>/dev/null").splitlines():
+        fields = line.split()
+        if len(fields) == 2: pvs[fields[0]] = fields[1]
+    disks = {}
+    for dev in tree:
+        if dev.get("type") != "disk" or dev.get("name", "").startswith("loop"): continue
+        dev["size"] = int(dev.get("size") or 0)
+        dev["model"] = (dev.get("model") or "").strip()
+        dev["rota"] = str(dev.get("rota")).lower() in ("1", "true")
+        disks[dev.get("path") or f"/dev/{dev['name']}"] = dev
+    return {"os_drive": get_os_drive(), "disks": disks, "pvs": pvs}
+
+def is_os_drive(device, inv=None):
+    inv = inv or get_inventory()
+    os_drive = inv["os_drive"]
     if not os_drive: return False
     if device == os_drive: return True
+    dev = inv["disks"].get(device)
+    if not dev: return False
     
-    if os_drive.startswith("/dev/mapper/"):
-        # Check partitions
-        parts = run_cmd(f"lsblk -n -o NAME {device} | grep -v '^{os.path.basename(device)}$'")
-        for part in parts.splitlines():
-            if not part.strip(): continue
-            # Check if partition is PV for OS
-            pv_check = run_cmd(f"sudo pvs --noheadings -o vg_name /dev/{part.strip()} 2>/dev/null").strip()
-            if pv_check and (pv_check == "ubuntu-vg" or pv_check == "ubuntu--vg"): return True
-            
-        # Check for boot partitions
-        mount_points = run_cmd(f"lsblk -n -o MOUNTPOINT {device}")
-        if "/boot" in mount_points or "/boot/efi" in mount_points: return True
+    for _, part in walk(dev):
+        path = part.get("path") or f"/dev/{part.get('name')}"
+        # Root filesystem lives on this drive (plain partition or LV on top of it)
+        if path == os_drive or any(m in OS_MOUNTS for m in mounts(part)): return True
+        # Check if partition is PV for OS
+        if inv["pvs"].get(path) in OS_VGS: return True
     return False
 
-def get_health(device):
-    data = {}
-    if "nvme" in device:
-        # NVMe health
-        output = run_cmd(f"sudo nvme smart-log {device} 2>/dev/null")
-        # Extract basic health info
-        for line in output.splitlines():
-            if "critical_warning" in line:
-                val = line.split(":")[-1].strip()
-                data["health"] = "PASSED" if val == "0" else "FAILED"
-            elif "temperature" in line and "°C" in line:
-                val = line.split(":")[-1].strip().split()[0]
-                if val.isdigit(): data["temp"] = f"{val}°C"
-            elif "percentage_used" in line:
-                val = line.split(":")[-1].strip()
-                data["wear"] = val
-            elif "available_spare" in line and "threshold" not in line:
-                val = line.split(":")[-1].strip()
-                data["spare"] = val
-            elif "Data Units Written" in line and "(" in line:
-                val = line.split("(")[-1].split(")")[0]
-                data["written"] = val
-            elif "power_on_hours" in line:
-                val = line.split(":")[-1].strip()
-                if val.isdigit():
-                    hours = int(val)
-                    days = hours // 24
-                    data["power_on"] = f"{days} days ({hours} hours)"
-            elif "media_errors" in line:
-                val = line.split(":")[-1].strip()
-                data["errors"] = val
-    else:
-        # SATA health
-        output = run_cmd(f"sudo smartctl -H {device} 2>/dev/null")
-        if "PASSED" in output: data["health"] = "PASSED"
-        elif "FAILED" in output: data["health"] = "FAILED"
-        
-        # Get attributes
-        output = run_cmd(f"sudo smartctl -A {device} 2>/dev/null")
-        for line in output.splitlines():
-            if "Temperature" in line:
-                match = re.search(r'(\d+)(?:\s*Celsius|\s*°C|\s*C)', line)
-                if match: data["temp"] = f"{match.group(1)}°C"
-            elif "Power_On_Hours" in line:
-                match = re.search(r'\d+\s+Power_On_Hours.*?(\d+)', line)
-                if match:
-                    hours = int(match.group(1))
-                    days = hours // 24
-                    data["power_on"] = f"{days} days ({hours} hours)"
-            elif "Reallocated_Sector" in line:
-                match = re.search(r'\d+\s+Reallocated_Sector.*?(\d+)', line)
-                if match: data["reallocated"] = match.group(1)
-            elif "Media_Wearout" in line or "Wear_Leveling" in line:
-                match = re.search(r'\d+\s+(Media_Wearout|Wear_Leveling).*?(\d+)', line)
-                if match: data["wear"] = f"{match.group(2)}%"
+class Health:
+    """Typed SMART/NVMe health record for one drive (None = not reported); stale = age of last-known fields"""
+    __slots__ = ("health", "temp", "wear", "spare", "written", "power_on_hours", "errors", "reallocated", "last_health", "stale")
+    
+    def __init__(self, health="Unknown", **fields):
+        self.health = health
+        for name in self.__slots__[1:]: setattr(self, name, fields.get(name))
+    
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+NVME_UNIT = 512000  # "Data Units Written" are thousands of 512-byte blocks
+
+def to_int(val):
+    """Leading integer of a SMART field ("1,234 (632 GB)", "35 °C", "100%") or None"""
+    match = re.match(r"\s*(\d[\d,]*)", str(val))
+    return int(match.group(1).replace(",", "")) if match else None
+
+def fmt_written(size):
+    return f"{size/1e12:.2f} TB" if size >= 1e12 else f"{size/1e9:.2f} GB"
+
+def parse_nvme_json(doc):
+    temp = doc.get("temperature")
+    if temp is not None and temp > 200: temp -= 273  # nvme-cli reports Kelvin
+    written = doc.get("data_units_written")
+    return Health("PASSED" if doc.get("critical_warning") == 0 else "FAILED",
+                  temp=temp, wear=doc.get("percent_used", doc.get("percentage_used")),
+                  spare=doc.get("avail_spare"), written=written * NVME_UNIT if written is not None else None,
+                  power_on_hours=doc.get("power_on_hours"), errors=doc.get("media_errors"))
+
+def parse_nvme_text(output):
+    fields = {}
+    for line in output.splitlines():
+        if ":" not in line: continue
+        key, val = line.split(":", 1)
+        fields[key.strip().lower().replace(" ", "_")] = val.strip()
+    if "critical_warning" not in fields: return Health()
+    written = to_int(fields.get("data_units_written", ""))
+    return Health("PASSED" if to_int(fields["critical_warning"]) == 0 else "FAILED",
+                  temp=to_int(fields.get("temperature", "")), wear=to_int(fields.get("percentage_used", "")),
+                  spare=to_int(fields.get("available_spare", "")), written=written * NVME_UNIT if written is not None else None,
+                  power_on_hours=to_int(fields.get("power_on_hours", "")), errors=to_int(fields.get("media_errors", "")))
+
+def ata_wear(attr_id, value):
+    # Wear_Leveling_Count (177) / Media_Wearout_Indicator (233) normalize to life left
+    return 100 - value if attr_id in (177, 233) and value is not None and value <= 100 else None
+
+def parse_smartctl_json(doc):
+    passed = doc.get("smart_status", {}).get("passed")
+    data = Health("PASSED" if passed else "FAILED" if passed is False else "Unknown",
+                  temp=doc.get("temperature", {}).get("current"),
+                  power_on_hours=doc.get("power_on_time", {}).get("hours"))
+    for attr in doc.get("ata_smart_attributes", {}).get("table", []):
+        if attr.get("id") == 5: data.reallocated = attr.get("raw", {}).get("value")
+        data.wear = ata_wear(attr.get("id"), attr.get("value")) if data.wear is None else data.wear
+    # SAS/SCSI and NVMe-behind-smartctl report these elsewhere
+    nvme = doc.get("nvme_smart_health_information_log")
+    if nvme:
+        data.wear, data.spare, data.errors = nvme.get("percentage_used"), nvme.get("available_spare"), nvme.get("media_errors")
+        written = nvme.get("data_units_written")
+        data.written = written * NVME_UNIT if written is not None else None
     return data
 
-def find_control_plane(drives):
-    """Find best Control Plane drive: not OS, < 900GB, NVMe preferred"""
-    os_drives = [d for d in drives if is_os_drive(d)]
+def parse_smartctl_text(output):
+    data = Health("PASSED" if "PASSED" in output or ": OK" in output else "FAILED" if "FAILED" in output else "Unknown")
+    for line in output.splitlines():
+        fields = line.split()
+        # ID# ATTRIBUTE_NAME FLAG VALUE WORST THRESH TYPE UPDATED WHEN_FAILED RAW_VALUE
+        if len(fields) >= 10 and fields[0].isdigit() and fields[2].startswith("0x"):
+            attr_id, value, raw = int(fields[0]), to_int(fields[3]), to_int(fields[9])
+            if attr_id == 5: data.reallocated = raw
+            elif attr_id == 9: data.power_on_hours = raw
+            elif attr_id in (190, 194) and data.temp is None: data.temp = raw
+            elif data.wear is None: data.wear = ata_wear(attr_id, value)
+        elif line.startswith("Current Drive Temperature:"): data.temp = to_int(line.split(":", 1)[1])
+    return data
+
+def get_health(device, timeout=None):
+    """One structured probe per drive (smartctl --json / nvme -o json), text parsing as fallback"""
+    deadline = time.monotonic() + timeout if timeout else None
+    remaining = lambda: max(deadline - time.monotonic(), 0.1) if deadline else None
+    if "nvme" in device:
+        output = run_cmd(f"sudo nvme smart-log -o json {device} 2>/dev/null", remaining())
+        try: return parse_nvme_json(json.loads(output))
+        except (ValueError, TypeError, AttributeError): pass
+        return parse_nvme_text(run_cmd(f"sudo nvme smart-log {device} 2>/dev/null", remaining()))
+    # smartctl's exit status is a bitmask that is non-zero on healthy-but-noisy drives;
+    # -n standby makes it bail out instead of spinning up a sleeping disk
+    output = run_cmd(f"sudo smartctl -n standby -a --json {device} 2>/dev/null || true", remaining())
+    if STANDBY_RE.search(output): return Health("Unknown (standby)")
+    try:
+        doc = json.loads(output)
+        if "smart_status" in doc or "ata_smart_attributes" in doc: return parse_smartctl_json(doc)
+    except (ValueError, TypeError, AttributeError): pass
+    # smartmontools < 7.0 has no --json: health and attributes in one call
+    output = run_cmd(f"sudo smartctl -n standby -H -A {device} 2>/dev/null || true", remaining())
+    return Health("Unknown (standby)") if STANDBY_RE.search(output) else parse_smartctl_text(output)
+
+def collect_health(drives, timeout=PROBE_TIMEOUT, workers=PROBE_WORKERS):
+    """Probe all drives concurrently; a hung drive is reported, not waited on"""
+    results = {}
+    if not drives: return results
+    with ThreadPoolExecutor(max_workers=min(workers, len(drives))) as pool:
+        futures = {pool.submit(get_health, drive, timeout): drive for drive in drives}
+        for future in as_completed(futures):
+            drive = futures[future]
+            try: results[drive] = future.result()
+            except subprocess.TimeoutExpired: results[drive] = Health("Unknown (timeout)")
+            except Exception: results[drive] = Health()
+    return results
+
+def cache_key(dev):
+    """Stable identity of a drive across reboots and renames; None when it has none"""
+    return dev.get("wwn") or (dev.get("serial") and f"{dev['model']}:{dev['serial']}") or None
+
+def load_health_cache(path=None):
+    try:
+        with open(path or HEALTH_CACHE) as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def save_health_cache(entries, path=None):
+    """Merge entries into the cache file; written via rename so readers never see a torn file"""
+    path = path or HEALTH_CACHE
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cache = {**load_health_cache(path), **entries}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f: json.dump(cache, f)
+        os.replace(tmp, path)
+    except OSError: pass
+
+def fmt_age(seconds):
+    return f"{seconds / 60:.0f}m" if seconds < 3600 else f"{seconds / 3600:.1f}h" if seconds < 86400 else f"{seconds / 86400:.1f}d"
+
+def cached_health(drives, inv, ttl=HEALTH_TTL, refresh=False, stale_max=HEALTH_STALE_MAX):
+    """collect_health() behind an on-disk TTL cache keyed by WWN/serial"""
+    cache, now = load_health_cache(), time.time()
+    keys = {d: cache_key(inv["disks"][d]) for d in drives}
+    results = {}
+    if not refresh:
+        for drive, key in keys.items():
+            entry = cache.get(key) if key else None
+            if entry and now - entry["time"] < ttl: results[drive] = Health(**entry["health"])
+    probed = collect_health([d for d in drives if d not in results])
+    fresh = {}
+    for drive, data in probed.items():
+        key = keys[drive]
+        if data.health.startswith("Unknown"):
+            # Sleeping drive: show the last known fields, marked stale, rather than spin it up.
+            # No fallback for timeouts: a hung drive must not inherit an old PASSED.
+            entry = cache.get(key) if key and data.health == "Unknown (standby)" else None
+            if entry and now - entry["time"] < stale_max:
+                last = entry["health"]
+                data = Health(**{**last, "health": data.health, "last_health": last["health"], "stale": round(now - entry["time"])})
+        elif key: fresh[key] = {"time": now, "health": data.as_dict()}
+        results[drive] = data
+    if fresh:
+        save_health_cache(fresh)
+        record_health(fresh)
+    return results
+
+HISTORY_FIELDS = ("wear", "reallocated", "errors", "power_on_hours", "temp", "written")
+
+def open_history(path=None):
+    """SQLite history keyed (drive, time): WITHOUT ROWID keeps each drive's samples clustered for range scans"""
+    import sqlite3
+    path = path or HEALTH_HISTORY
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, timeout=10)
+    db.execute(f"CREATE TABLE IF NOT EXISTS samples (drive TEXT NOT NULL, time INTEGER NOT NULL, "
+               f"{', '.join(f + ' INTEGER' for f in HISTORY_FIELDS)}, PRIMARY KEY (drive, time)) WITHOUT ROWID")
+    return db
+
+def record_health(entries, path=None):
+    """Append one sample per freshly probed drive ({cache key: cache entry}), in a single transaction"""
+    if not (path or HEALTH_HISTORY): return
+    import sqlite3  # only runs that probed a drive pay for the import
+    rows = [(key, int(e["time"]), *(e["health"].get(f) for f in HISTORY_FIELDS)) for key, e in entries.items()]
+    try:
+        db = open_history(path)
+        try:
+            with db: db.executemany(f"INSERT OR IGNORE INTO samples VALUES ({', '.join('?' * (2 + len(HISTORY_FIELDS)))})", rows)
+        finally: db.close()
+    except (OSError, sqlite3.Error): pass
+
+def forecast_wear(db, key, wear=None, now=None, window=FORECAST_WINDOW):
+    """Least-squares wear slope over the window (aggregated in SQL) and the days left until 100% wear"""
+    now = now or time.time()
+    start = now - window * 86400
+    n, sx, sy, sxx, sxy, first, last, realloc, errors = db.execute(
+        "SELECT COUNT(wear), SUM(CASE WHEN wear IS NOT NULL THEN x END), SUM(wear), "
+        "SUM(CASE WHEN wear IS NOT NULL THEN x * x END), SUM(x * wear), MIN(x), MAX(x), "
+        "MAX(reallocated) - MIN(reallocated), MAX(errors) - MIN(errors) "
+        "FROM (SELECT (time - ?) / 86400.0 AS x, wear, reallocated, errors FROM samples WHERE drive = ? AND time >= ?)",
+        (start, key, int(start))).fetchone()
+    if first is None: return None
+    span = last - first
+    result = {"samples": n, "span_days": round(span, 1), "wear_per_day": None, "days_to_wearout": None,
+              "realloc_per_day": realloc / span if span and realloc is not None else None,
+              "errors_per_day": errors / span if span and errors is not None else None}
+    denom = n * sxx - sx * sx if n >= 2 else 0
+    if denom > 0:
+        slope = (n * sxy - sx * sy) / denom
+        result["wear_per_day"] = slope
+        if slope > 0:
+            current = wear if wear is not None else (sy - slope * sx) / n + slope * last
+            result["days_to_wearout"] = max(int((100 - current) / slope), 0)
+    return result
+
+def wear_forecasts(records, path=None, window=FORECAST_WINDOW):
+    """{device: forecast} for Tier 1/Tier 2 drives that have history"""
+    path = path or HEALTH_HISTORY
+    targets = [r for r in records if r["tier"] in FORECAST_TIERS and cache_key(r)]
+    if not targets or not path or not os.path.exists(path): return {}
+    import sqlite3
+    try:
+        db = sqlite3.connect(path, timeout=10)
+        try: return {r["device"]: forecast_wear(db, cache_key(r), r["health"].wear, window=window) for r in targets}
+        finally: db.close()
+    except sqlite3.Error: return {}
+
+QUEUE_ATTRS = ("rotational", "nr_requests", "logical_block_size")
+
+def block_queue(name):
+    """Integer attributes from /sys/block/<name>/queue; unreadable ones are left out"""
+    queue = {}
+    for attr in QUEUE_ATTRS:
+        try:
+            with open(f"{SYS_BLOCK}/{name}/queue/{attr}") as f: queue[attr] = int(f.read())
+        except (OSError, ValueError): pass
+    return queue
+
+def read_latency(device, samples=LATENCY_SAMPLES, block=4096):
+    """Median/p99 ms of random O_DIRECT reads from the raw device (read-only); None without access"""
+    import mmap, random
+    try: fd = os.open(device, os.O_RDONLY | os.O_DIRECT)
+    except (OSError, AttributeError): return None
+    buf = mmap.mmap(-1, block)  # page-aligned, as O_DIRECT requires
+    times = []
+    try:
+        blocks = max(os.lseek(fd, 0, os.SEEK_END) // block, 1)
+        for _ in range(samples):
+            offset = random.randrange(blocks) * block
+            start = time.perf_counter()
+            os.preadv(fd, [buf], offset)
+            times.append((time.perf_counter() - start) * 1000)
+    except OSError: return None
+    finally:
+        os.close(fd)
+        buf.close()
+    times.sort()
+    return {"p50": round(times[len(times) // 2], 4), "p99": round(times[min(len(times) * 99 // 100, len(times) - 1)], 4)}
+
+def rank_control_plane(drives, inv=None, health=None, bench=False):
+    """Control plane candidates, best first: solid-state, healthy and unworn, lowest measured latency"""
+    inv, health = inv or get_inventory(), health or {}
     candidates = []
-    
     for drive in drives:
-        if drive in os_drives: continue
-        size = run_cmd(f"lsblk -d -n -o SIZE {drive}").strip()
-        # Convert to GB
-        size_num = float(re.sub(r'[^0-9.]', '', size))
-        if size.endswith('T'): size_gb = size_num * 1024
-        else: size_gb = size_num
-        
-        # Add score for type (NVMe preferred)
-        type_score = 10 if 'nvme' in drive else 0
-        # Add score for smaller size
-        size_score = 5 if size_gb < 900 else 0
-        
-        candidates.append((drive, size_gb, type_score + size_score))
-    
-    # Sort by score (higher is better), then by size (smaller is better)
-    if candidates:
-        candidates.sort(key=lambda x: (-x[2], x[1]))
-        return candidates[0][0]
-    return None
+        dev = inv["disks"].get(drive, {})
+        data = health.get(drive) or Health()
+        # Never the OS drive, a failed drive, or a size-0 device (zram, empty card reader)
+        if not dev.get("size") or data.health == "FAILED" or is_os_drive(drive, inv): continue
+        queue = block_queue(dev.get("kname") or drive.replace("/dev/", ""))
+        candidates.append({"device": drive, "size": dev["size"], "rotational": bool(queue.get("rotational", dev["rota"])),
+                           "nvme": drive.startswith("/dev/nvme") or dev.get("tran") == "nvme",
+                           "nr_requests": queue.get("nr_requests", 0), "wear": data.wear, "latency": None})
+    if bench:
+        # Spinning disks rank last regardless, so only solid-state candidates are measured
+        probe = [c for c in candidates if not c["rotational"]]
+        with ThreadPoolExecutor(max_workers=max(1, min(PROBE_WORKERS, len(probe)))) as pool:
+            for c, latency in zip(probe, pool.map(lambda c: read_latency(c["device"]), probe)): c["latency"] = latency
+    # Latency is bucketed to 0.1 ms so probe noise doesn't override the capacity/wear preferences
+    candidates.sort(key=lambda c: (c["rotational"], (c["wear"] or 0) >= CP_WEAR_LIMIT, c["latency"] is None,
+                                   round(c["latency"]["p50"], 1) if c["latency"] else 0, not c["nvme"],
+                                   c["size"] >= CP_MAX_SIZE, -c["nr_requests"], c["wear"] or 0, c["size"]))
+    return candidates
 
-def main():
-    print(f"{BOLD}OpenStack Storage Device Health & Information{RESET}\n" + "="*45)
-    print("Storage Tier Classification:")
-    print(f"  {RED}{BOLD}OS Drive{RESET}: Operating System installation - DO NOT REMOVE!")
-    print(f"  {GREEN}{BOLD}Control Plane{RESET}: OpenStack control services (separate from OS)")
-    print(f"  {YELLOW}{BOLD}Tier 1 (NVMe){RESET}: High performance storage for critical workloads")
-    print(f"  {BLUE}{BOLD}Tier 2 (SSD){RESET}: Medium performance storage for general workloads")
-    print(f"  {CYAN}{BOLD}Tier 3 (HDD){RESET}: Capacity-optimized storage for bulk data")
-    
-    # Get OS drive
-    os_drive = get_os_drive()
-    print(f"\nOS drive identified as: {os_drive}")
-    
-    # Get all drives
-    output = run_cmd("lsblk -d -n -o NAME,TYPE | grep disk")
-    drives = []
-    for line in output.splitlines():
-        if line.strip() and not line.split()[0].startswith("loop"):
-            drives.append(f"/dev/{line.split()[0]}")
-    
-    if not drives:
-        print("No drives found!")
-        return
-        
-    # Find control plane drive
-    cp_drive = find_control_plane(drives)
-    if cp_drive:
-        print(f"Control Plane drive selected: {cp_drive}")
-    
-    # Process each drive
+def find_control_plane(drives, inv=None, health=None, bench=False):
+    """Best Control Plane drive (see rank_control_plane), or None"""
+    ranked = rank_control_plane(drives, inv, health, bench)
+    return ranked[0]["device"] if ranked else None
+
+TIERS = {"OS Drive": RED, "Control Plane": GREEN, "Tier 1 (NVMe)": YELLOW, "Tier 2 (SSD)": BLUE, "Tier 3 (HDD)": CYAN}
+
+def get_tier(drive, dev, is_os, is_cp):
+    if is_os: return "OS Drive"
+    if is_cp: return "Control Plane"
+    if 'nvme' in drive: return "Tier 1 (NVMe)"
+    if 'ssd' in dev["model"].lower(): return "Tier 2 (SSD)"
+    return "Tier 3 (HDD)"
+
+def classify_drives(inv):
+    """{drive: tier} for every disk in the inventory"""
+    drives = list(inv["disks"])
+    # Rank with the cached SMART results (no probing) so --watch labels the same drive as the report
+    cache = load_health_cache()
+    keys = {d: cache_key(inv["disks"][d]) for d in drives}
+    health = {d: Health(**cache[key]["health"]) for d, key in keys.items() if key in cache}
+    cp_drive = find_control_plane(drives, inv, health)
+    return {d: get_tier(d, inv["disks"][d], is_os_drive(d, inv), d == cp_drive) for d in drives}
+
+def collect(inv=None, ttl=HEALTH_TTL, refresh=False, window=FORECAST_WINDOW, bench=False):
+    """Gather every drive record (classification, health, partitions) without formatting"""
+    inv = inv or get_inventory()
+    drives = list(inv["disks"])
+    # SMART/NVMe health for every drive in parallel; control plane selection uses it
+    health_data = cached_health(drives, inv, ttl, refresh)
+    ranking = rank_control_plane(drives, inv, health_data, bench)
+    cp_drive = ranking[0]["device"] if ranking else None
+    records = []
     for drive in drives:
-        # Get info
-        name = drive.replace("/dev/", "")
-        model = run_cmd(f"lsblk -d -n -o MODEL {drive}").strip()
-        size = run_cmd(f"lsblk -d -n -o SIZE {drive}").strip()
-        is_os = is_os_drive(drive)
-        is_cp = (drive == cp_drive)
-        
-        # Get health data
-        data = get_health(drive)
-        
-        # Determine tier
-        if is_os:
-            tier = f"{RED}{BOLD}OS Drive{RESET}"
-            header_marker = f" {RED}{BOLD}[OS DRIVE - DO NOT REMOVE!]{RESET}"
-        elif is_cp:
-            tier = f"{GREEN}{BOLD}Control Plane{RESET}"
-            header_marker = f" {GREEN}{BOLD}[CONTROL PLANE]{RESET}"
-        elif 'nvme' in drive:
-            tier = f"{YELLOW}{BOLD}Tier 1 (NVMe){RESET}"
-            header_marker = ""
-        elif 'ssd' in model.lower():
-            tier = f"{BLUE}{BOLD}Tier 2 (SSD){RESET}"
-            header_marker = ""
-        else:
-            tier = f"{CYAN}{BOLD}Tier 3 (HDD){RESET}"
-            header_marker = ""
+        dev = inv["disks"][drive]
+        is_os, is_cp = is_os_drive(drive, inv), drive == cp_drive
+        parts = []
+        for depth, part in walk(dev):
+            path = part.get("path") or f"/dev/{part.get('name')}"
+            parts.append({"name": part.get("name", ""), "path": path, "depth": depth, "size": int(part.get("size") or 0),
+                          "mountpoint": (mounts(part) or [None])[0], "fstype": part.get("fstype"), "vg": inv["pvs"].get(path)})
+        records.append({"device": drive, "name": drive.replace("/dev/", ""), "model": dev["model"], "size": dev["size"],
+                        "serial": dev.get("serial"), "wwn": dev.get("wwn"), "rotational": dev["rota"],
+                        "tier": get_tier(drive, dev, is_os, is_cp), "os_drive": is_os, "control_plane": is_cp,
+                        "health": health_data.get(drive) or Health(), "partitions": parts})
+    forecasts = wear_forecasts(records, window=window)
+    for rec in records: rec["forecast"] = forecasts.get(rec["device"])
+    return {"host": socket.gethostname(), "os_drive": inv["os_drive"], "control_plane": cp_drive,
+            "control_plane_ranking": ranking, "drives": records}
+
+def render(report):
+    """Colored text report, as a list of lines"""
+    out = [f"{BOLD}OpenStack Storage Device Health & Information{RESET}\n" + "="*45,
+           "Storage Tier Classification:",
+           f"  {RED}{BOLD}OS Drive{RESET}: Operating System installation - DO NOT REMOVE!",
+           f"  {GREEN}{BOLD}Control Plane{RESET}: OpenStack control services (separate from OS)",
+           f"  {YELLOW}{BOLD}Tier 1 (NVMe){RESET}: High performance storage for critical workloads",
+           f"  {BLUE}{BOLD}Tier 2 (SSD){RESET}: Medium performance storage for general workloads",
+           f"  {CYAN}{BOLD}Tier 3 (HDD){RESET}: Capacity-optimized storage for bulk data",
+           f"\nOS drive identified as: {report['os_drive']}"]
+    if not report["drives"]:
+        out.append("No drives found!")
+        return out
+    if report["control_plane"]:
+        best = report["control_plane_ranking"][0]
+        latency = f" (read latency p50 {best['latency']['p50']:.3f} ms, p99 {best['latency']['p99']:.3f} ms)" if best["latency"] else ""
+        out.append(f"Control Plane drive selected: {report['control_plane']}{latency}")
+    
+    for rec in report["drives"]:
+        name, data, tier = rec["name"], rec["health"], rec["tier"]
+        color = TIERS[tier]
+        header_marker = (f" {RED}{BOLD}[OS DRIVE - DO NOT REMOVE!]{RESET}" if rec["os_drive"] else
+                         f" {GREEN}{BOLD}[CONTROL PLANE]{RESET}" if rec["control_plane"] else "")
         
-        # Print header
-        print(f"\n{BOLD}{name} {'='*(25-len(name))}{RESET}{header_marker}")
-        print(f"  Model:       {model}")
-        print(f"  Size:        {size}")
-        print(f"  OpenStack:   {tier}")
+        # Header
+        out.append(f"\n{BOLD}{name} {'='*(25-len(name))}{RESET}{header_marker}")
+        out.append(f"  Model:       {rec['model']}")
+        out.append(f"  Size:        {fmt_size(rec['size'])}")
+        out.append(f"  OpenStack:   {color}{BOLD}{tier}{RESET}")
         
         # Health status
-        health = data.get("health", "Unknown")
+        health = data.health
         health_color = GREEN if health == "PASSED" else RED if health == "FAILED" else YELLOW
-        print(f"  Health:      {health_color}{health}{RESET}")
+        out.append(f"  Health:      {health_color}{health}{RESET}")
+        if data.stale is not None:
+            out.append(f"  Last known:  {YELLOW}{data.last_health}, {fmt_age(data.stale)} ago (stale: values below are from then){RESET}")
         
         # Temperature
-        if "temp" in data: print(f"  Temperature: {data['temp']}")
+        if data.temp is not None: out.append(f"  Temperature: {data.temp}°C")
+        
+        # Wear level (percentage of rated endurance used)
+        if data.wear is not None:
+            wear_color = GREEN if data.wear < 50 else (YELLOW if data.wear < 80 else RED)
+            out.append(f"  Wear Level:  {wear_color}{data.wear}%{RESET}")
+        
+        # Wear-out forecast from the sample history (Tier 1/2 only)
+        fc = rec.get("forecast")
+        if fc and fc["days_to_wearout"] is not None:
+            days = fc["days_to_wearout"]
+            fc_color = RED if days < 90 else (YELLOW if days < 365 else GREEN)
+            out.append(f"  Wear-out:    {fc_color}~{days} days{RESET} ({fc['wear_per_day'] * 30:.2f}%/month over {fc['span_days']:g} days)")
+        elif fc and fc["samples"] >= 2:
+            out.append(f"  Wear-out:    no measurable wear over {fc['span_days']:g} days")
+        if fc and fc["realloc_per_day"]:
+            out.append(f"  Realloc:     {RED}+{fc['realloc_per_day']:.2f} sectors/day{RESET}")
         
         # Drive specific info
-        if "nvme" in drive:
-            if "wear" in data:
-                wear = data["wear"]
-                wear_val = int(wear.rstrip("%")) if wear.endswith("%") else 0
-                wear_color = GREEN if wear_val < 50 else (YELLOW if wear_val < 80 else RED)
-                print(f"  Wear Level:  {wear_color}{wear}{RESET}")
-            if "spare" in data: print(f"  Spare:       {data['spare']}")
-            if "written" in data: print(f"  Data Written:{data['written']}")
-            if "errors" in data:
-                errors = data["errors"]
-                err_color = GREEN if errors == "0" else RED
-                print(f"  Media Errors:{err_color} {errors}{RESET}")
-        else:
-            if "wear" in data:
-                wear = data["wear"]
-                wear_val = int(wear.rstrip("%")) if wear.endswith("%") else 0
-                wear_color = GREEN if wear_val < 50 else (YELLOW if wear_val < 80 else RED)
-                print(f"  Wear Level:  {wear_color}{wear}{RESET}")
-            if "reallocated" in data:
-                sectors = data["reallocated"]
-                sec_color = GREEN if sectors == "0" else RED
-                print(f"  Reallocated: {sec_color}{sectors} sectors{RESET}")
+        if "nvme" in rec["device"]:
+            if data.spare is not None: out.append(f"  Spare:       {data.spare}%")
+            if data.written is not None: out.append(f"  Data Written:{fmt_written(data.written)}")
+            if data.errors is not None:
+                err_color = GREEN if data.errors == 0 else RED
+                out.append(f"  Media Errors:{err_color} {data.errors}{RESET}")
+        elif data.reallocated is not None:
+            sec_color = GREEN if data.reallocated == 0 else RED
+            out.append(f"  Reallocated: {sec_color}{data.reallocated} sectors{RESET}")
         
         # Power on time
-        if "power_on" in data: print(f"  Power On:    {data['power_on']}")
+        if data.power_on_hours is not None:
+            out.append(f"  Power On:    {data.power_on_hours // 24} days ({data.power_on_hours} hours)")
         
         # Partition info
-        print("  Partitions:")
-        parts = run_cmd(f"lsblk -n -o NAME,SIZE,MOUNTPOINT,FSTYPE {drive} | grep -v ^{os.path.basename(drive)}$")
-        if parts.strip():
-            for part_line in parts.splitlines():
-                if not part_line.strip(): continue
-                p_parts = part_line.split()
-                if len(p_parts) >= 2:
-                    part_name, part_size = p_parts[0], p_parts[1]
-                    info = f"    {part_name} ({part_size})"
-                    
-                    # Mount point
-                    mount_idx = part_line.find("/")
-                    if mount_idx > 0:
-                        mount = part_line[mount_idx:].split()[0]
-                        info += f" → {mount}"
-                        if mount in ["/", "/boot", "/boot/efi"]: info += f" {RED}[OS]{RESET}"
-                    elif len(p_parts) >= 4 and p_parts[3]:
-                        info += f" ({p_parts[3]})"
-                        if p_parts[3] == "LVM2_member":
-                            vg = run_cmd(f"sudo pvs --noheadings -o vg_name /dev/{part_name} 2>/dev/null").strip()
-                            if vg and (vg == "ubuntu-vg" or vg == "ubuntu--vg"):
-                                info += f" {RED}[OS-LVM]{RESET}"
-                    print(info)
-        else:
-            print("    None")
+        out.append("  Partitions:")
+        for part in rec["partitions"]:
+            info = f"    {'  '*part['depth']}{part['name']} ({fmt_size(part['size'])})"
+            if part["mountpoint"]:
+                info += f" → {part['mountpoint']}"
+                if part["mountpoint"] in OS_MOUNTS: info += f" {RED}[OS]{RESET}"
+            elif part["fstype"]:
+                info += f" ({part['fstype']})"
+                if part["fstype"] == "LVM2_member" and part["vg"] in OS_VGS: info += f" {RED}[OS-LVM]{RESET}"
+            out.append(info)
+        if not rec["partitions"]: out.append("    None")
+    return out
+
+def read_diskstats():
+    """{kernel name: (ios, sectors, io ms, in flight, io_ticks, time_in_queue)} from one /proc/diskstats read"""
+    stats = {}
+    with open(PROC_DISKSTATS) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 14: continue
+            v = [int(x) for x in fields[3:14]]
+            # reads, sectors read, ms reading, writes, sectors written, ms writing, in flight, io_ticks, time_in_queue
+            stats[fields[2]] = (v[0] + v[4], v[2] + v[6], v[3] + v[7], v[8], v[9], v[10])
+    return stats
+
+def io_rates(prev, cur, elapsed):
+    """iostat-style metrics for one device between two diskstats samples"""
+    ios, sectors, io_ms, _, ticks, queue = [max(c - p, 0) for c, p in zip(cur, prev)]
+    return {"iops": ios / elapsed, "mbps": sectors * 512 / elapsed / 1e6, "await": io_ms / ios if ios else 0.0,
+            "queue": queue / (elapsed * 1000), "util": min(ticks / (elapsed * 10), 100.0), "ios": ios}
+
+def tier_rates(rows):
+    """Aggregate device rows per tier: summed IOPS/MB/s/queue, IO-weighted await, mean util"""
+    tiers = {}
+    for row in rows:
+        t = tiers.setdefault(row["tier"], {"tier": row["tier"], "drives": 0, "iops": 0.0, "mbps": 0.0, "await": 0.0, "queue": 0.0, "util": 0.0, "ios": 0})
+        t["drives"] += 1
+        for key in ("iops", "mbps", "queue", "util", "ios"): t[key] += row[key]
+        t["await"] += row["await"] * row["ios"]
+    for t in tiers.values():
+        t["await"] = t["await"] / t["ios"] if t["ios"] else 0.0
+        t["util"] /= t["drives"]
+    return [tiers[name] for name in TIERS if name in tiers]
+
+def render_io(rows, tiers, interval):
+    out = [f"{BOLD}OpenStack Storage I/O{RESET} (every {interval:g}s, Ctrl-C to exit)",
+           f"{BOLD}{'Device':<14}{'Tier':<16}{'IOPS':>10}{'MB/s':>10}{'await ms':>10}{'queue':>8}{'util':>8}{RESET}"]
+    line = lambda name, tier, r: (f"{name:<14}{TIERS[tier]}{tier:<16}{RESET}{r['iops']:>10.1f}{r['mbps']:>10.2f}{r['await']:>10.2f}"
+                                  f"{r['queue']:>8.2f}{RED if r['util'] >= 90 else YELLOW if r['util'] >= 60 else GREEN}{r['util']:>7.1f}%{RESET}")
+    for row in rows: out.append(line(row["name"], row["tier"], row))
+    out.append(f"{BOLD}{'-'*76}{RESET}")
+    for t in tiers: out.append(line(f"{t['drives']} drive(s)", t["tier"], t))
+    return out
+
+def watch_io(interval, as_json=False):
+    """Sample /proc/diskstats every interval and report per device and per tier; file reads only"""
+    inv = get_inventory()
+    tiers = classify_drives(inv)
+    names = {inv["disks"][d].get("kname") or d.replace("/dev/", ""): d for d in tiers}
+    host = socket.gethostname()
+    prev, prev_time = read_diskstats(), time.monotonic()
+    next_tick = prev_time + interval
+    try:
+        while True:
+            # Fixed schedule so render time doesn't skew the interval
+            time.sleep(max(next_tick - time.monotonic(), 0))
+            next_tick += interval
+            cur, now = read_diskstats(), time.monotonic()
+            rows = []
+            for name, drive in names.items():
+                if name in cur and name in prev:
+                    rows.append({"device": drive, "name": name, "tier": tiers[drive], **io_rates(prev[name], cur[name], now - prev_time)})
+            prev, prev_time = cur, now
+            summary = tier_rates(rows)
+            if as_json:
+                stamp = time.time()
+                out = [json.dumps({"host": host, "time": stamp, **r}) for r in rows + summary]
+                sys.stdout.write("\n".join(out) + "\n" if out else "")
+            else:
+                sys.stdout.write("\033[H\033[J" + "\n".join(render_io(rows, summary, interval)) + "\n")
+            sys.stdout.flush()
+    except KeyboardInterrupt: pass
+
+def to_json(obj):
+    return obj.as_dict() if isinstance(obj, Health) else str(obj)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenStack storage device health and tier classification")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--json", action="store_true", help="emit one JSON document for the host")
+    mode.add_argument("--ndjson", action="store_true", help="emit one JSON object per drive")
+    parser.add_argument("--refresh", action="store_true", help="ignore cached SMART results and re-probe every drive")
+    parser.add_argument("--cache-ttl", type=float, default=HEALTH_TTL, metavar="SECONDS", help="reuse SMART results younger than this")
+    parser.add_argument("--no-history", action="store_true", help="don't append SMART samples to the trend store")
+    parser.add_argument("--forecast-window", type=float, default=FORECAST_WINDOW, metavar="DAYS", help="history used for wear-out forecasts")
+    parser.add_argument("--bench-latency", action="store_true", help="rank control plane candidates by measured O_DIRECT read latency (root)")
+    parser.add_argument("--watch", type=float, metavar="INTERVAL", help="sample I/O per drive and tier every INTERVAL seconds")
+    parser.add_argument("--profile", type=int, nargs="?", const=10, metavar="N", help="at exit, show the N slowest/most costly external commands")
+    parser.add_argument("--trace", metavar="FILE", help="write every external command (argv, duration, exit, bytes) to FILE as JSON")
+    args = parser.parse_args(argv)
+    
+    if args.profile or args.trace:
+        global PROFILE
+        PROFILE = []
+        atexit.register(finish_profile, args.profile, args.trace)
+    if args.no_history:
+        global HEALTH_HISTORY
+        HEALTH_HISTORY = None
+    if args.watch: return watch_io(args.watch, as_json=args.json or args.ndjson)
+    report = collect(ttl=args.cache_ttl, refresh=args.refresh, window=args.forecast_window, bench=args.bench_latency)
+    if args.json: out = [json.dumps(report, default=to_json)]
+    elif args.ndjson: out = [json.dumps({"host": report["host"], **rec}, default=to_json) for rec in report["drives"]]
+    else: out = render(report)
+    # Buffered: the whole report goes out in a single write
+    sys.stdout.write("\n".join(out) + "\n")
 
 if __name__ == "__main__":
     main()
-
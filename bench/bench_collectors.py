@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark storage_check.main() and network_interfaces.main() on replayed hosts.
+
+Runs each collector against synthetic hosts (4/24/96 disks, 10/500/5000
+interfaces by default) or recorded fixtures, and reports subprocess count,
+wall time and peak Python memory. --output appends the results as JSON lines
+tagged with the git revision, so runs can be compared over time.
+"""
+import io
+import json
+import time
+import argparse
+import subprocess
+import tracemalloc
+import contextlib
+
+from replay import ROOT, replayed, synthetic_host
+import storage_check
+import network_interfaces
+
+DISK_COUNTS = (4, 24, 96)
+INTERFACE_COUNTS = (10, 500, 5000)
+
+
+def measure(fixture, run, repeat, latency):
+    """Best-of-repeat wall time, subprocess count and peak traced memory for one run()."""
+    walls = []
+    for _ in range(repeat):
+        with replayed(fixture, latency) as replay, contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            run()
+            walls.append(time.perf_counter() - started)
+    # Separate pass: tracemalloc slows everything down, so it's kept out of the timings
+    with replayed(fixture, latency) as replay, contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"subprocesses": len(replay.calls), "misses": len(replay.misses),
+            "wall_ms": round(min(walls) * 1000, 3), "peak_kib": round(peak / 1024, 1)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], check=True, text=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.strip()
+    except (subprocess.SubprocessError, OSError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the storage and network collectors on replayed hosts")
+    parser.add_argument("--disks", type=int, nargs="*", default=DISK_COUNTS, help="synthetic disk counts")
+    parser.add_argument("--interfaces", type=int, nargs="*", default=INTERFACE_COUNTS, help="synthetic interface counts")
+    parser.add_argument("--fixture", action="append", default=[], help="recorded fixture to benchmark (repeatable)")
+    parser.add_argument("--mode", choices=("text", "json"), default="text", help="collector output mode to exercise")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (best is reported)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per subprocess")
+    parser.add_argument("--output", help="append results as JSON lines to this file")
+    args = parser.parse_args(argv)
+
+    flags = ["--json"] if args.mode == "json" else []
+    storage = lambda: storage_check.main(flags + ["--refresh"])
+    network = lambda: network_interfaces.main(flags)
+    cases = [("storage", synthetic_host(n, 1), storage) for n in args.disks]
+    cases += [("network", synthetic_host(1, n), network) for n in args.interfaces]
+    for path in args.fixture:
+        with open(path) as f:
+            fixture = json.load(f)
+        cases += [("storage", fixture, storage), ("network", fixture, network)]
+
+    revision, stamp = git_revision(), time.time()
+    results = []
+    print(f"{'collector':<10}{'host':<32}{'subprocs':>9}{'wall ms':>11}{'peak KiB':>11}")
+    for collector, fixture, run in cases:
+        result = {"collector": collector, "host": fixture["name"], "mode": args.mode, "latency": args.latency,
+                  "revision": revision, "time": stamp, **measure(fixture, run, args.repeat, args.latency)}
+        results.append(result)
+        miss = f"  ({result['misses']} unrecorded commands)" if result["misses"] else ""
+        print(f"{collector:<10}{fixture['name'][:31]:<32}{result['subprocesses']:>9}{result['wall_ms']:>11.2f}"
+              f"{result['peak_kib']:>11.1f}{miss}")
+    if args.output:
+        with open(args.output, "a") as f:
+            f.writelines(json.dumps(r) + "\n" for r in results)
+
+
+if __name__ == "__main__":
+    main()
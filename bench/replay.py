@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""Record/replay backend for the storage and network collectors.
+
+A fixture is a JSON document holding the output of every external command a
+collector ran ("commands") and the kernel files it read ("files", "symlinks",
+paths relative to a fake root). replayed() materializes the files into a
+temporary tree, points the collectors' SYS_NET/PROC_NET/PROC_DISKSTATS/SYS_BLOCK at it
+and swaps run_cmd()/run_command() for a Replay that serves the recorded
+outputs and counts every call.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "Storage"), os.path.join(ROOT, "Network")]
+
+import storage_check
+import network_interfaces
+
+BLOCK_ATTRS = storage_check.QUEUE_ATTRS
+NET_ATTRS = ("address", "speed", "operstate", "mtu", "ifindex", "carrier_changes")
+
+
+class Replay:
+    """Stands in for run_cmd()/run_command(), serving recorded outputs."""
+
+    def __init__(self, commands, latency=0.0):
+        self.commands = commands
+        self.latency = latency
+        self.calls = []
+        self.misses = []
+
+    def __call__(self, cmd, timeout=None):
+        self.calls.append(cmd)
+        if self.latency:
+            # Emulates process spawn cost the in-memory replay doesn't pay
+            time.sleep(self.latency)
+        if cmd not in self.commands:
+            self.misses.append(cmd)
+            return ""
+        return self.commands[cmd]
+
+
+def materialize(fixture, root):
+    """Write the fixture's files and symlinks under root."""
+    for rel, content in fixture.get("files", {}).items():
+        path = os.path.join(root, rel)
+        if content is None:
+            os.makedirs(path, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    for rel, target in fixture.get("symlinks", {}).items():
+        # Only the target's basename matters to the collectors (driver/module names)
+        target_dir = os.path.join(root, "_targets", rel, target)
+        os.makedirs(target_dir, exist_ok=True)
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.symlink(target_dir, path)
+
+
+def reset_caches():
+    """Drop the collectors' per-run state so each replay starts cold."""
+    network_interfaces._link_table = None
+    network_interfaces._type_cache.clear()
+
+
+@contextlib.contextmanager
+def replayed(fixture, latency=0.0):
+    """Run the collectors against a fixture; yields the Replay recording the calls."""
+    root = tempfile.mkdtemp(prefix="replay-")
+    saved = (storage_check.run_cmd, network_interfaces.run_command, storage_check.PROC_DISKSTATS,
+             storage_check.HEALTH_CACHE, storage_check.HEALTH_HISTORY, storage_check.SYS_BLOCK,
+             network_interfaces.SYS_NET, network_interfaces.PROC_NET)
+    replay = Replay(fixture.get("commands", {}), latency)
+    try:
+        materialize(fixture, root)
+        storage_check.run_cmd = network_interfaces.run_command = replay
+        storage_check.PROC_DISKSTATS = os.path.join(root, "proc", "diskstats")
+        storage_check.HEALTH_CACHE = os.path.join(root, "cache", "smart.json")
+        storage_check.HEALTH_HISTORY = os.path.join(root, "cache", "smart-history.db")
+        storage_check.SYS_BLOCK = os.path.join(root, "sys", "block")
+        network_interfaces.SYS_NET = os.path.join(root, "sys", "class", "net")
+        network_interfaces.PROC_NET = os.path.join(root, "proc", "net")
+        reset_caches()
+        yield replay
+    finally:
+        (storage_check.run_cmd, network_interfaces.run_command, storage_check.PROC_DISKSTATS,
+         storage_check.HEALTH_CACHE, storage_check.HEALTH_HISTORY, storage_check.SYS_BLOCK,
+         network_interfaces.SYS_NET, network_interfaces.PROC_NET) = saved
+        reset_caches()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def read_file(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def record():
+    """Run both collectors on this host and capture everything they read."""
+    commands = {}
+
+    def recording(run):
+        def wrapper(cmd, *args, **kwargs):
+            commands[cmd] = out = run(cmd, *args, **kwargs)
+            return out
+        return wrapper
+
+    # Probe with a throwaway SMART cache/history so recording leaves the host's own untouched
+    root = tempfile.mkdtemp(prefix="record-")
+    saved = (storage_check.run_cmd, network_interfaces.run_command,
+             storage_check.HEALTH_CACHE, storage_check.HEALTH_HISTORY)
+    storage_check.run_cmd = recording(saved[0])
+    network_interfaces.run_command = recording(saved[1])
+    storage_check.HEALTH_CACHE = os.path.join(root, "smart.json")
+    storage_check.HEALTH_HISTORY = os.path.join(root, "smart-history.db")
+    try:
+        reset_caches()
+        storage_check.collect(refresh=True)
+        network_interfaces.collect()
+    finally:
+        (storage_check.run_cmd, network_interfaces.run_command,
+         storage_check.HEALTH_CACHE, storage_check.HEALTH_HISTORY) = saved
+        reset_caches()
+        shutil.rmtree(root, ignore_errors=True)
+
+    files, symlinks = {}, {}
+    for rel in ("proc/diskstats", "proc/net/dev"):
+        files[rel] = read_file(os.path.join("/", rel))
+    if os.path.isdir("/proc/net/vlan"):
+        for name in os.listdir("/proc/net/vlan"):
+            files[f"proc/net/vlan/{name}"] = read_file(f"/proc/net/vlan/{name}") or ""
+    for disk in os.listdir("/sys/block"):
+        for attr in BLOCK_ATTRS:
+            files[f"sys/block/{disk}/queue/{attr}"] = read_file(f"/sys/block/{disk}/queue/{attr}")
+    for iface in os.listdir("/sys/class/net"):
+        base = f"/sys/class/net/{iface}"
+        for attr in NET_ATTRS:
+            # Unreadable attributes (speed on virtual links) replay as empty
+            if os.path.exists(f"{base}/{attr}"):
+                files[f"sys/class/net/{iface}/{attr}"] = read_file(f"{base}/{attr}") or ""
+        for marker in ("bridge", "bonding"):
+            if os.path.isdir(f"{base}/{marker}"):
+                files[f"sys/class/net/{iface}/{marker}"] = None
+        for link in ("device/driver", "device/driver/module"):
+            if os.path.exists(f"{base}/{link}"):
+                symlinks[f"sys/class/net/{iface}/{link}"] = os.path.basename(os.readlink(f"{base}/{link}"))
+    return {"name": os.uname().nodename, "commands": commands,
+            "files": {k: v for k, v in files.items() if v is not None or k.endswith(("bridge", "bonding"))},
+            "symlinks": symlinks}
+
+
+def disk_names(count):
+    """sda..sdz, sdaa..: kernel naming for SCSI disks."""
+    names = []
+    for i in range(count):
+        name, n = "", i
+        while True:
+            name = chr(ord("a") + n % 26) + name
+            n = n // 26 - 1
+            if n < 0:
+                break
+        names.append(f"sd{name}")
+    return names
+
+
+def synthetic_host(disks, interfaces):
+    """Fixture for a host with the given disk and interface counts.
+
+    Disk 0 is an LVM OS disk; the rest cycle NVMe / SATA SSD / HDD. Interfaces
+    are a few physical NICs, bridges and VLANs, then tap/qvo/qbr/veth ports
+    the way a busy compute node looks.
+    """
+    commands, files, symlinks = {}, {}, {}
+
+    # Storage
+    sata = iter(disk_names(disks))
+    blockdevices, diskstats, nvme_index = [], [], 0
+    for i in range(disks):
+        kind = "os" if i == 0 else ("nvme", "ssd", "hdd")[i % 3]
+        if kind == "nvme":
+            name, nvme_index = f"nvme{nvme_index}n1", nvme_index + 1
+            model, size, rota = "Samsung SSD 980 PRO 1TB", 1000204886016, False
+        else:
+            name = next(sata)
+            model, size, rota = {"os": ("Samsung SSD 870 EVO 500GB", 500107862016, False),
+                                 "ssd": ("Samsung SSD 870 EVO 2TB", 2000398934016, False),
+                                 "hdd": ("ST8000NM0055-1RM112", 8001563222016, True)}[kind]
+        dev = {"name": name, "kname": name, "path": f"/dev/{name}", "type": "disk", "size": size,
+               "model": model, "serial": f"S{i:07d}", "wwn": f"0x5002538e{i:08x}", "rota": rota,
+               "fstype": None, "mountpoint": None, "mountpoints": [None], "children": []}
+        if kind == "os":
+            dev["children"] = [
+                {"name": f"{name}1", "path": f"/dev/{name}1", "type": "part", "size": 1127219200,
+                 "fstype": "vfat", "mountpoints": ["/boot/efi"]},
+                {"name": f"{name}2", "path": f"/dev/{name}2", "type": "part", "size": 2147483648,
+                 "fstype": "ext4", "mountpoints": ["/boot"]},
+                {"name": f"{name}3", "path": f"/dev/{name}3", "type": "part", "size": size - 3274702848,
+                 "fstype": "LVM2_member", "mountpoints": [None], "children": [
+                     {"name": "ubuntu--vg-ubuntu--lv", "path": "/dev/mapper/ubuntu--vg-ubuntu--lv",
+                      "type": "lvm", "size": 107374182400, "fstype": "ext4", "mountpoints": ["/"]}]},
+            ]
+        blockdevices.append(dev)
+        for attr, value in zip(BLOCK_ATTRS, (int(rota), 1023 if kind == "nvme" else 64, 512)):
+            files[f"sys/block/{name}/queue/{attr}"] = f"{value}\n"
+        diskstats.append(f" 8 {i * 16} {name} {1000 * i} 10 {80000 * i} 500 {2000 * i} 20 {160000 * i} "
+                         f"900 0 1400 1400 0 0 0 0")
+        if kind == "nvme":
+            commands[f"sudo nvme smart-log -o json /dev/{name} 2>/dev/null"] = json.dumps({
+                "critical_warning": 0, "temperature": 310, "avail_spare": 100, "percent_used": i % 40,
+                "data_units_written": 12345678 + i, "power_on_hours": 8760 + i, "media_errors": 0})
+        else:
+            table = [{"id": 5, "name": "Reallocated_Sector_Ct", "value": 100, "raw": {"value": 0}},
+                     {"id": 9, "name": "Power_On_Hours", "value": 95, "raw": {"value": 20000 + i}},
+                     {"id": 194, "name": "Temperature_Celsius", "value": 66, "raw": {"value": 34}}]
+            if kind != "hdd":
+                table.append({"id": 177, "name": "Wear_Leveling_Count", "value": 97 - i % 30, "raw": {"value": 42}})
+            commands[f"sudo smartctl -n standby -a --json /dev/{name} 2>/dev/null || true"] = json.dumps({
+                "smart_status": {"passed": True}, "temperature": {"current": 34},
+                "power_on_time": {"hours": 20000 + i}, "ata_smart_attributes": {"table": table}})
+    commands["lsblk --json -b -O"] = json.dumps({"blockdevices": blockdevices})
+    commands["sudo pvs --noheadings -o pv_name,vg_name 2>/dev/null"] = f"  /dev/{blockdevices[0]['name']}3 ubuntu-vg"
+    commands["df -h /"] = ("Filesystem                         Size  Used Avail Use% Mounted on\n"
+                           "/dev/mapper/ubuntu--vg-ubuntu--lv   98G   20G   73G  22% /")
+    files["proc/diskstats"] = "\n".join(diskstats) + "\n"
+
+    # Network
+    fixed = [("lo", None, None), ("eno1", None, "ixgbe"), ("eno2", None, "ixgbe"), ("eno3", None, "igb"),
+             ("eno4", None, "igb"), ("br-ex", "bridge", None), ("br-int", "openvswitch", None),
+             ("bond0", "bond", None), ("eno1.100", "vlan", None), ("eno1.200", "vlan", None)]
+    ports = ("tap", "qvo", "qvb", "qbr", "veth")
+    links, netdev = [], []
+    for index in range(interfaces):
+        if index < len(fixed):
+            name, kind, driver = fixed[index]
+        else:
+            prefix = ports[index % len(ports)]
+            name = f"{prefix}{index:08x}-{index % 97:02x}"[:15]
+            kind = "bridge" if prefix == "qbr" else "veth" if prefix in ("qvo", "qvb", "veth") else "tun"
+            driver = None
+        link = {"ifindex": index + 1, "ifname": name, "flags": ["BROADCAST", "UP", "LOWER_UP"], "mtu": 1500,
+                "operstate": "UP" if index % 7 else "DOWN", "link_type": "ether",
+                "address": f"fa:16:3e:{index >> 16 & 255:02x}:{index >> 8 & 255:02x}:{index & 255:02x}",
+                "addr_info": []}
+        if kind:
+            link["linkinfo"] = {"info_kind": kind}
+            if kind == "vlan":
+                link["linkinfo"]["info_data"] = {"protocol": "802.1Q", "id": int(name.split(".")[1])}
+                link["link"] = "eno1"
+        if name.startswith("tap"):
+            link["master"] = f"qbr{index:08x}"[:15]
+        if name in ("lo", "br-ex", "eno1.100") or name.startswith("eno"):
+            link["addr_info"] = [{"family": "inet", "local": f"10.{index}.0.1", "prefixlen": 24},
+                                 {"family": "inet6", "local": f"fd00:{index:x}::1", "prefixlen": 64},
+                                 {"family": "inet6", "local": f"fe80::{index:x}", "prefixlen": 64}]
+        links.append(link)
+        base = f"sys/class/net/{name}"
+        files[f"{base}/address"] = link["address"] + "\n"
+        files[f"{base}/operstate"] = link["operstate"].lower() + "\n"
+        files[f"{base}/mtu"] = "1500\n"
+        files[f"{base}/ifindex"] = f"{index + 1}\n"
+        files[f"{base}/carrier_changes"] = "2\n"
+        files[f"{base}/speed"] = ("10000\n" if driver == "ixgbe" else "1000\n") if driver else ""
+        if kind == "bridge":
+            files[f"{base}/bridge"] = None
+        if kind == "bond":
+            files[f"{base}/bonding"] = None
+        if kind == "vlan":
+            files[f"proc/net/vlan/{name}"] = ""
+        if driver:
+            symlinks[f"{base}/device/driver"] = driver
+            symlinks[f"{base}/device/driver/module"] = driver
+        netdev.append(f"{name:>6}: {index * 1000} {index * 10} 0 0 0 0 0 0 {index * 2000} {index * 20} 0 0 0 0 0 0")
+    commands["ip -j -d addr show"] = json.dumps(links)
+    files["proc/net/dev"] = ("Inter-|   Receive                                                |  Transmit\n"
+                             " face |bytes    packets errs drop fifo frame compressed multicast|"
+                             "bytes    packets errs drop fifo colls carrier compressed\n" + "\n".join(netdev) + "\n")
+
+    return {"name": f"synthetic-{disks}d-{interfaces}i", "commands": commands, "files": files, "symlinks": symlinks}
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Record this host's collector inputs as a replay fixture")
+    parser.add_argument("output", help="fixture file to write")
+    args = parser.parse_args(argv)
+    with open(args.output, "w") as f:
+        json.dump(record(), f)
+
+
+if __name__ == "__main__":
+    main()